@@ -2,47 +2,93 @@
 billow AutoScaleGroup API
 """
 import billow
-from billow import aws
-import boto
-import boto.ec2
-import boto.ec2.autoscale
 import time
-import fnmatch
-import re
+from billow import aws
+from billow import coalesce
+from billow import configcache
+from billow import imagecatalog
+from billow import instanceindex
+from billow import tagindex
+from billow import ttlcache
+from boto.exception import BotoServerError
+
+# names per DescribeAutoScalingGroups call, the API limit
+GROUP_CHUNK = 50
+
+# ids per DescribeInstances / DescribeInstanceStatus call when coalescing
+INSTANCE_CHUNK = 200
+STATUS_CHUNK = 100
+
+# seconds the region instance index is used before being rebuilt
+INSTANCE_INDEX_MAXAGE = 15
+
+# seconds the region tag index is used before being rebuilt
+TAG_INDEX_MAXAGE = 60
+
+# seconds the region image catalog is used before being rebuilt
+IMAGE_CATALOG_MAXAGE = 300
+
+# scaling activity states that never change again
+ACTIVITY_FINISHED = frozenset(['Successful', 'Failed', 'Cancelled'])
+
+# activities per page when tailing
+ACTIVITY_TAIL_PAGE = 20
+
+# seconds describe results are reused, per resource type
+DESCRIBE_TTL = {
+    'status': 5,
+    'activities': 5,
+    'addresses': 30,
+}
 
 
 class asg(object):
 
     def __init__(self, region):
         self.region = region
-        self.aws = aws.aws()
+        self.aws = aws.aws(region=self.region)
         self.asg = None
         self.ec2 = None
         self.cachetime = 60
-        self.__lc_find_cache_time = time.time()
-        self.__lc_find_cache = None
+        self.config_cache = configcache.configCache(
+            (self.aws.access_key(), self.region),
+            self.__describe_configs, cachetime=self.cachetime)
+        self.instance_batch = coalesce.coalescer(
+            self.__describe_instances, key=lambda i: i.id,
+            chunk=INSTANCE_CHUNK)
+        self.status_batch = coalesce.coalescer(
+            self.__describe_instance_status, key=lambda s: s.id,
+            chunk=STATUS_CHUNK)
+        # region instance index, freshness window in instance_index.maxage
+        self.instance_index = instanceindex.instanceIndex(
+            self.__describe_group_instances, maxage=INSTANCE_INDEX_MAXAGE)
+        # every group tag in the region, for service discovery
+        self.tag_index = tagindex.tagIndex(
+            self.iter_tags, maxage=TAG_INDEX_MAXAGE)
+        # Images of imagecatalog.get_owners(), listed once per maxage
+        self.image_catalog = imagecatalog.imageCatalog(
+            self.__describe_images, maxage=IMAGE_CATALOG_MAXAGE)
+        # describe results, invalidated by our own mutations
+        self.describe_cache = ttlcache.ttlCache(DESCRIBE_TTL)
 
     def __connect(self):
         if not self.asg:
-            self.asg = boto.ec2.autoscale.connect_to_region(
-                self.region,
-                aws_access_key_id=self.aws.access_key(),
-                aws_secret_access_key=self.aws.secret_key()
-            )
+            self.asg = self.aws.connect('autoscale')
 
     def __connect_ec2(self):
         if not self.ec2:
-            self.ec2 = boto.ec2.connect_to_region(
-                self.region,
-                aws_access_key_id=self.aws.access_key(),
-                aws_secret_access_key=self.aws.secret_key()
-            )
+            self.ec2 = self.aws.connect('ec2')
 
     def list_groups(self):
         """
         list all AutoScaleGroups in a region
         """
-        self.asgs = list()
+        return list(self.iter_groups())
+
+    def iter_groups(self):
+        """
+        iterate over all AutoScaleGroups in a region, a page at a time
+        """
         marker = None
         self.__connect()
 
@@ -51,19 +97,23 @@ class asg(object):
                 self.asg.get_all_groups,
                 next_token=marker
             )
-            self.asgs.extend(asgs)
+            for a in asgs:
+                yield a
             if asgs.next_token:
                 marker = asgs.next_token
             else:
                 break
 
-        return self.asgs
-
     def list_tags(self, name=None, tag=None, value=None):
         """
         list all AutoScaleGroups with a specific tag in a region
         """
-        self.tags = list()
+        return list(self.iter_tags(name=name, tag=tag, value=value))
+
+    def iter_tags(self, name=None, tag=None, value=None):
+        """
+        iterate over AutoScaleGroup tags in a region, a page at a time
+        """
         marker = None
         self.__connect()
 
@@ -83,60 +133,96 @@ class asg(object):
                 filters=filters,
                 next_token=marker
             )
-            self.tags.extend(tags)
+            for t in tags:
+                yield t
             if tags.next_token:
                 marker = tags.next_token
             else:
                 break
 
-        return self.tags
-
     def list_configs(self):
         """
-        list all LaunchConfigurations a region
+        list all LaunchConfigurations a region, from the on-disk cache
+        """
+        return self.config_cache.all()
+
+    def iter_configs(self):
+        """
+        iterate over all LaunchConfigurations in a region, a page at a time,
+        bypassing the cache
         """
-        self.lcs = list()
         marker = None
         self.__connect()
 
         while True:
-            lcs = self.aws.wrap(
+            a = self.aws.wrap(
                 self.asg.get_all_launch_configurations,
+                max_records=100,
                 next_token=marker
             )
-            self.lcs.extend(lcs)
-            if lcs.next_token:
-                marker = lcs.next_token
+            for lc in a:
+                yield lc
+            if a.next_token:
+                marker = a.next_token
             else:
                 break
 
-        return self.lcs
+    def __describe_configs(self):
+        return list(self.iter_configs())
 
     def get_groups(self, groups):
         """
         get AutoScaleGroup in a region
+
+        Names are sent GROUP_CHUNK at a time, chunks are fetched
+        concurrently.
         """
         asgs = list()
-        marker = None
         self.__connect()
 
         if not isinstance(groups, list):
             groups = [groups]
 
-        while True:
-            a = self.aws.wrap(
-                self.asg.get_all_groups,
-                names=groups,
-                next_token=marker
-            )
+        chunks = [groups[i:i + GROUP_CHUNK]
+                  for i in range(0, len(groups), GROUP_CHUNK)] or [groups]
+        calls = list()
+        for c in chunks:
+            calls.append((self.asg.get_all_groups, (),
+                          {'names': c, 'max_records': GROUP_CHUNK}))
+
+        for c, a in zip(chunks, self.aws.wrap_many(calls)):
             asgs.extend(a)
-            if a.next_token:
-                marker = a.next_token
-            else:
-                break
+            while a.next_token:
+                a = self.aws.wrap(
+                    self.asg.get_all_groups,
+                    names=c,
+                    max_records=GROUP_CHUNK,
+                    next_token=a.next_token
+                )
+                asgs.extend(a)
 
         return asgs
 
+    def load_groups(self, groups):
+        """
+        Bulk load billowGroups not loaded yet, pushing in their
+        AutoScaleGroups instead of one get_groups call per group
+        """
+        byname = dict()
+        for g in groups:
+            if not g.rawgroup:
+                byname.setdefault(g.group, list()).append(g)
+        if not byname:
+            return list()
+
+        loaded = list()
+        for a in self.get_groups(byname.keys()):
+            for g in byname.get(a.name, list()):
+                g.push(a)
+                loaded.append(g)
+
+        return loaded
+
     def get_configs(self, names):
         """
         get LaunchConfigurations in a region
@@ -162,33 +248,108 @@ class asg(object):
 
         return configs
 
-    def get_instance(self, instance_ids):
+    def want_instances(self, instance_ids):
+        """
+        Announce instances likely to be looked up soon, so get_instance and
+        get_instance_status fetch them along with the next lookup.  Indexed
+        instances are read from the index, only statuses are fetched.
+        """
+        self.instance_batch.want([i for i in instance_ids
+                                  if i not in self.instance_index.by_id])
+        self.status_batch.want(instance_ids)
+
+    def get_instance(self, instance_ids, fresh=False):
         """
         get Instances in a region
+
+        Instances are read from the region instance index.  Those missing
+        from it (eg. not in a group, or launched since it was built) are
+        looked up with other callers' in coalesced, chunked calls.  fresh
+        skips the index and prefetched lookups, for callers waiting on an
+        instance to change, and updates the index with what it finds.
+        """
+        if not isinstance(instance_ids, list):
+            instance_ids = [instance_ids]
+
+        if fresh:
+            (instances, missing) = (list(), instance_ids)
+        else:
+            (instances, missing) = self.instance_index.lookup(instance_ids)
+        if not missing:
+            return instances
+
+        try:
+            if fresh:
+                with aws.fresh_reads():
+                    found = self.instance_batch.get(missing, fresh=True)
+            else:
+                found = self.instance_batch.get(missing)
+        except BotoServerError as e:
+            if e.error_code == 'InvalidInstanceID.NotFound':
+                return instances
+            else:
+                raise e
+        self.instance_index.add(found)
+        instances.extend(found)
+
+        return instances
+
+    def get_group_instances(self, group_name, instance_ids, fresh=False):
+        """
+        get Instances of an AutoScaleGroup, instance_ids its members, from
+        the region instance index group view.  Members not indexed yet, or
+        all of them when fresh, are looked up like get_instance.
+        """
+        if fresh:
+            return self.get_instance(instance_ids, fresh=True)
+
+        members = dict((i.id, i)
+                       for i in self.instance_index.group(group_name))
+        instances = [members[i] for i in instance_ids if i in members]
+        missing = [i for i in instance_ids if i not in members]
+        if missing:
+            instances.extend(self.get_instance(missing))
+
+        return instances
+
+    def __describe_group_instances(self):
+        """
+        every AutoScaleGroup instance in the region
         """
         instances = list()
         marker = None
         self.__connect_ec2()
 
-        if not isinstance(instance_ids, list):
-            instance_ids = [instance_ids]
+        while True:
+            reservations = self.aws.wrap(
+                self.ec2.get_all_reservations,
+                filters={'tag-key': instanceindex.GROUP_TAG},
+                next_token=marker
+            )
+            for r in reservations:
+                instances.extend(r.instances)
+            if reservations.next_token:
+                marker = reservations.next_token
+            else:
+                break
+
+        return instances
+
+    def __describe_instances(self, instance_ids):
+        instances = list()
+        marker = None
+        self.__connect_ec2()
 
         while True:
             #
             # Use get_all_reservations() since get_only_instances does not
             # support next_token for rate-limiting
             #
-            try:
-                reservations = self.aws.wrap(
-                    self.ec2.get_all_reservations,
-                    instance_ids=instance_ids,
-                    next_token=marker
-                )
-            except BotoServerError as e:
-                if e.error_code == 'InvalidInstanceID.NotFound':
-                    return list()
-                else:
-                    raise e
+            reservations = self.aws.wrap(
+                self.ec2.get_all_reservations,
+                instance_ids=instance_ids,
+                next_token=marker
+            )
             for r in reservations:
                 for i in r.instances:
                     instances.append(i)
@@ -202,14 +363,38 @@ class asg(object):
     def get_instance_status(self, instance_ids, filters=None):
         """
         get Instance Status' in a region
+
+        Unfiltered lookups are cached per instance for a few seconds, and
+        coalesced like get_instance.
         """
+        if not isinstance(instance_ids, list):
+            instance_ids = [instance_ids]
+
+        if filters:
+            return self.__describe_instance_status(instance_ids, filters)
+
+        statuses = list()
+        missing = list()
+        for i in instance_ids:
+            (found, s) = self.describe_cache.get('status', i)
+            if found:
+                statuses.append(s)
+            else:
+                missing.append(i)
+
+        if missing:
+            fetched = self.status_batch.get(missing)
+            for s in fetched:
+                self.describe_cache.put('status', s.id, s)
+            statuses.extend(fetched)
+
+        return statuses
+
+    def __describe_instance_status(self, instance_ids, filters=None):
         statuses = list()
         marker = None
         self.__connect_ec2()
 
-        if not isinstance(instance_ids, list):
-            instance_ids = [instance_ids]
-
         while True:
             s = self.aws.wrap(
                 self.ec2.get_all_instance_status,
@@ -226,95 +411,62 @@ class asg(object):
 
         return statuses
 
+    def __describe_images(self):
+        """
+        every Image of the configured owners in a region, by default our
+        own and those shared with us, for the image catalog
+        """
+        self.__connect_ec2()
+        owners = imagecatalog.get_owners()
+        if owners:
+            return self.aws.wrap(
+                self.ec2.get_all_images,
+                owners=owners
+            )
+
+        images = dict()
+        for found in self.aws.wrap_many([
+                (self.ec2.get_all_images, (), {'owners': ['self']}),
+                (self.ec2.get_all_images, (), {'executable_by': ['self']})]):
+            for i in found:
+                images[i.id] = i
+        return images.values()
+
     def match_images_name(self, name):
         """
-        match Images in a region.
+        match Images in a region, from the image catalog.
 
         An asterisk (*) matches zero or more characters, and a question mark
-        (?) matches exactly one character.
+        (?) matches exactly one character, as in DescribeImages filters.
         http://docs.aws.amazon.com/AWSEC2/latest/CommandLineReference/ApiReference-cmd-DescribeImages.html
         """
-        images = list()
-        self.__connect_ec2()
-        amifilter = {'name': name}
-
-        images = self.aws.wrap(
-            self.ec2.get_all_images,
-            filters=amifilter
-        )
-
-        return images
+        return self.image_catalog.match(name)
 
     def match_images_tags(self, tags):
         """
-        get Images in a region
+        get Images in a region, from the image catalog
         tags = { 'key': value, 'key2': value2 }
         """
-        images = list()
-        self.__connect_ec2()
-
-        amifilter = list()
-        for k, v in tags.iteritems():
-            f = {'tag:%s' % k, v}
-            amifilter.append(f)
-
-        images = self.aws.wrap(
-            self.ec2.get_all_images,
-            filters=amifilter
-        )
-
-        return images
+        return self.image_catalog.tagged(tags)
 
     def cache_configs(self):
         """
-        There is no API for this, so implement a simple cache to preserve the
-        full list of LaunchConfigs since this can be a heavy call.
+        There is no API for this, so keep the full list of LaunchConfigs in
+        an on-disk cache since this can be a heavy call, see configcache.
         """
-        if self.__lc_find_cache and (self.__lc_find_cache_time +
-                                     self.cachetime) < time.time():
-            self.__lc_find_cache = None
-
-        if not self.__lc_find_cache:
-            self.__lc_find_cache = list()
-            marker = None
-            self.__connect()
-
-            while True:
-                lcs = self.aws.wrap(
-                    self.asg.get_all_launch_configurations,
-                    next_token=marker
-                )
-                self.__lc_find_cache.extend(lcs)
-                if lcs.next_token:
-                    marker = lcs.next_token
-                else:
-                    break
+        self.config_cache.refresh()
 
     def regex_configs(self, regex):
         """
         find LaunchConfigurations by regex.
         """
-        self.cache_configs()
-
-        configs = list()
-        for lc in self.__lc_find_cache:
-            if re.match(regex, lc.name):
-                configs.append(lc)
-
-        return configs
+        return self.config_cache.search(regex)
 
     def match_configs(self, match):
         """
         find LaunchConfigurations by fnmatch
         """
-        self.cache_configs()
-
-        configs = list()
-        for lc in self.__lc_find_cache:
-            if fnmatch.fnmatch(lc.name, match):
-                configs.append(lc)
-
-        return configs
+        return self.config_cache.match(match)
 
     def terminate(self, instance_id, decrement_capacity=True):
         """
@@ -326,9 +478,55 @@ class asg(object):
             instance_id=instance_id,
             decrement_capacity=decrement_capacity
         )
+        group = self.__instance_group(instance_id)
+        self.__invalidate_instances([instance_id])
+
+        self.describe_cache.invalidate(
+            'addresses',
+            lambda k, v: any(a.instance_id == instance_id for a in v))
+        if group:
+            self.describe_cache.invalidate('activities',
+                                           lambda k, v: k[0] == group)
+        else:
+            self.describe_cache.invalidate('activities')
 
         return ret
 
+    def __instance_group(self, instance_id):
+        """
+        AutoScaleGroup name of an indexed instance, without calling AWS
+        """
+        instance = self.instance_index.by_id.get(instance_id)
+        if instance is None:
+            return None
+        return instance.tags.get(instanceindex.GROUP_TAG)
+
+    def __invalidate_instances(self, instance_ids):
+        """
+        Forget what is known of instances changed by our own writes, of
+        every instance when instance_ids is None: index entries, prefetched
+        lookups and cached statuses
+        """
+        if instance_ids is None:
+            self.instance_index.invalidate()
+            self.describe_cache.invalidate('status')
+        else:
+            self.instance_index.drop(instance_ids)
+            self.describe_cache.invalidate(
+                'status', lambda k, v: k in instance_ids)
+        self.instance_batch.invalidate(instance_ids)
+        self.status_batch.invalidate(instance_ids)
+
+    def __interface_instances(self, network_interface_id):
+        """
+        Instance ids to invalidate for a change to network_interface_id,
+        None (all) when the owner is not indexed
+        """
+        owner = self.instance_index.interface_owner(network_interface_id)
+        if owner is None:
+            return None
+        return [owner]
+
     def set_capacity(self, group_name, desired_capacity, honor_cooldown=False):
         """
         Set Desired Capacity for an AutoScaleGroup
@@ -340,18 +538,24 @@ class asg(object):
             desired_capacity=desired_capacity,
             honor_cooldown=honor_cooldown
         )
+        self.describe_cache.invalidate('activities',
+                                       lambda k, v: k[0] == group_name)
 
         return ret
 
-    def disassociate_address(self, association_id):
+    def disassociate_address(self, association_id, instance_id=None):
         """
-        Disassociate an address from an instance
+        Disassociate an address from an instance, instance_id when known
         """
 
         ret = self.aws.wrap(
             self.ec2.disassociate_address,
             association_id=association_id
             )
+        self.__invalidate_instances(instance_id and [instance_id])
+        self.describe_cache.invalidate(
+            'addresses',
+            lambda k, v: any(a.association_id == association_id for a in v))
 
         return ret
 
@@ -370,6 +574,23 @@ class asg(object):
             network_interface_id=network_interface_id,
             allow_reassociation=allow_reassociation
             )
+        if allow_reassociation:
+            # the address may have been taken from any instance
+            self.__invalidate_instances(None)
+        elif instance_id:
+            self.__invalidate_instances([instance_id])
+        else:
+            self.__invalidate_instances(
+                self.__interface_instances(network_interface_id))
+        # the address moves, and may displace the target's address
+        self.describe_cache.invalidate(
+            'addresses',
+            lambda k, v: any(a.allocation_id == allocation_id or
+                             (instance_id and
+                              a.instance_id == instance_id) or
+                             (network_interface_id and
+                              a.network_interface_id == network_interface_id)
+                             for a in v))
 
         return ret
 
@@ -384,9 +605,18 @@ class asg(object):
             network_interface_id=network_interface_id,
             private_ip_addresses=private_ip_addresses
             )
+        self.__invalidate_interface(network_interface_id)
 
         return ret
 
+    def __invalidate_interface(self, network_interface_id):
+        self.__invalidate_instances(
+            self.__interface_instances(network_interface_id))
+        self.describe_cache.invalidate(
+            'addresses',
+            lambda k, v: any(a.network_interface_id == network_interface_id
+                             for a in v))
+
     def assign_private_ip_addresses(self, network_interface_id=None,
             private_ip_addresses=None, allow_reassignment=False):
         """
@@ -399,6 +629,7 @@ class asg(object):
             private_ip_addresses=private_ip_addresses,
             allow_reassignment=False
             )
+        self.__invalidate_interface(network_interface_id)
 
         return ret
 
@@ -406,25 +637,69 @@ class asg(object):
         """
         list all AutoScaleGroup activities
         """
-        self.activities = list()
+        return self.describe_cache.fetch(
+            'activities', (group, max_records),
+            lambda: list(self.iter_activities(group, max_records)))
+
+    def tail_activities(self, group, known=None, limit=None):
+        """
+        AutoScaleGroup activities newer than the newest finished one in
+        known, the activities already seen, newest first.  Activities seen
+        unfinished are fetched again to follow progress.  At most limit
+        activities are returned.
+        """
+        starttime = time.time()
+        finished = set()
+        unfinished = set()
+        for a in known or list():
+            if a.status_code in ACTIVITY_FINISHED:
+                finished.add(a.activity_id)
+            else:
+                unfinished.add(a.activity_id)
+
+        activities = list()
+        for a in self.iter_activities(group, max_records=ACTIVITY_TAIL_PAGE):
+            if a.activity_id in finished and not unfinished:
+                break
+            unfinished.discard(a.activity_id)
+            activities.append(a)
+            if limit and len(activities) >= limit:
+                break
+
+        self.describe_cache.put('activities', (group, 'tail'), starttime)
+        return activities
+
+    def activities_tailed(self, group):
+        """
+        Time activities of group were last tailed, None once that is older
+        than the activities ttl or the group was changed since
+        """
+        (found, tailed) = self.describe_cache.get('activities',
+                                                  (group, 'tail'))
+        return tailed if found else None
+
+    def iter_activities(self, group, max_records=None):
+        """
+        iterate over AutoScaleGroup activities, newest first, a page at a
+        time, bypassing the cache
+        """
         marker = None
         self.__connect()
 
         while True:
-            activities = self.aws.wrap(
+            a = self.aws.wrap(
                 self.asg.get_all_activities,
                 autoscale_group=group,
                 max_records=max_records,
                 next_token=marker
             )
-            self.activities.extend(activities)
-            if activities.next_token:
-                marker = activities.next_token
+            for activity in a:
+                yield activity
+            if a.next_token:
+                marker = a.next_token
             else:
                 break
 
-        return self.activities
-
     def get_addresses(self, ip_addresses):
         """
         get Addresses
@@ -434,9 +709,11 @@ class asg(object):
         if not isinstance(ip_addresses, list):
             ip_addresses = [ip_addresses]
 
-        addrs = self.aws.wrap(
-            self.ec2.get_all_addresses,
-            addresses=ip_addresses
-        )
+        addrs = self.describe_cache.fetch(
+            'addresses', tuple(sorted(ip_addresses)),
+            lambda: self.aws.wrap(
+                self.ec2.get_all_addresses,
+                addresses=ip_addresses
+            ))
 
         return addrs
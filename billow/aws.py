@@ -1,36 +1,174 @@
 import sys
-try:
-    import boto
-except ImportError:
-    sys.stderr.write('boto required\n')
-    raise
-from boto.exception import BotoServerError
-from distutils.version import LooseVersion
+import contextlib
+import functools
+import hashlib
+import httplib
+import Queue
+import socket
+import threading
 import time
 import os
+from . import cassette
+from . import connections
+from . import deadline
+from . import hedge
+from . import identity
+from . import limiter
+from . import singleflight
+from . import stats
+
+# Throttling error codes across EC2, AutoScaling, ELB, STS and Route53
+THROTTLE_CODES = frozenset([
+    'Throttling',
+    'ThrottlingException',
+    'ThrottledException',
+    'RequestThrottled',
+    'RequestThrottledException',
+    'RequestLimitExceeded',
+    'TooManyRequestsException',
+    'PriorRequestNotComplete',
+])
+
+# Transient service-side failures worth retrying
+UNAVAILABLE_CODES = frozenset([
+    'ServiceUnavailable',
+    'Unavailable',
+    'InternalError',
+    'InternalFailure',
+])
+
+# Call priorities, see priority()
+PRIORITY_HIGH = limiter.PRIORITY_HIGH
+PRIORITY_NORMAL = limiter.PRIORITY_NORMAL
+PRIORITY_LOW = limiter.PRIORITY_LOW
+
+_priority = threading.local()
+
+
+@contextlib.contextmanager
+def priority(level):
+    """
+    Run the AWS calls made by this thread inside the block at priority level.
+    Without one, mutations run at PRIORITY_HIGH and reads at PRIORITY_NORMAL.
+    """
+    previous = getattr(_priority, 'level', None)
+    _priority.level = level
+    try:
+        yield
+    finally:
+        _priority.level = previous
+
+
+def prioritized(level):
+    """
+    Decorator running a function's AWS calls at priority level, eg. for
+    background polling loops
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with priority(level):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+_fresh = threading.local()
+
+
+@contextlib.contextmanager
+def fresh_reads():
+    """
+    Reads made by this thread inside the block never reuse a result
+    completed before they were made, only join identical calls in flight
+    """
+    previous = getattr(_fresh, 'active', False)
+    _fresh.active = True
+    try:
+        yield
+    finally:
+        _fresh.active = previous
+
+
+def polling(func):
+    """
+    Decorator running a function's AWS reads as fresh_reads(), for loops
+    waiting on a change
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with fresh_reads():
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def current_priority(action=None):
+    level = getattr(_priority, 'level', None)
+    if level is None:
+        if action and not singleflight.is_read(action):
+            return PRIORITY_HIGH
+        return PRIORITY_NORMAL
+    return level
+
+
+# Version checks and environment credentials, resolved once per process
+_validated_versions = dict()
+_environ_credentials = None
+
+
+def environ_credentials():
+    """
+    (access, secret) from the environment, read once per process
+    """
+    global _environ_credentials
+    if _environ_credentials is None:
+        _environ_credentials = (os.environ.get('AWS_ACCESS_KEY'),
+                                os.environ.get('AWS_SECRET_KEY'))
+    return _environ_credentials
+
+
+def load_boto():
+    """
+    Import boto on first use, so CLI startup never pays for it
+    """
+    try:
+        import boto
+        import boto.connection
+        import boto.exception
+    except ImportError:
+        sys.stderr.write('boto required\n')
+        raise
+    return boto
 
 
 class aws(object):
 
-    def __init__(self, delay=0, maxdelay=16):
+    def __init__(self, region='us-east-1', delay=0, maxdelay=16, workers=8):
         self.rate_limit_delay = delay
         self.rate_limit_maxdelay = maxdelay
+        self.workers = workers
         # requires unmerged https://github.com/boto/boto/pull/2898
         self.min_boto_version = '2.35.2'
-        self.region = 'us-east-1'
+        self.region = region
 
+        load_boto()
         if not self.validate_version(self.min_boto_version):
             sys.stderr.write("boto >= %s required\n" %
                              self.min_boto_version)
             raise ImportError
 
         # Import ENV vars if available, fall back to IAM instance-profile
-        self.aws_access = None
-        self.aws_secret = None
-        if 'AWS_ACCESS_KEY' in os.environ:
-            self.aws_access = os.environ['AWS_ACCESS_KEY']
-        if 'AWS_SECRET_KEY' in os.environ:
-            self.aws_secret = os.environ['AWS_SECRET_KEY']
+        (self.aws_access, self.aws_secret) = environ_credentials()
+
+        # Replayed calls never reach AWS, avoid instance-profile lookups
+        tape = cassette.get_cassette()
+        if tape and tape.replaying and not self.aws_access:
+            self.aws_access = 'replay'
+            self.aws_secret = 'replay'
+
+        # Rate limit shared by all backends using this account and region
+        self.limiter = limiter.get_bucket((self.aws_access, self.region))
+        self.backoff = limiter.get_backoff((self.aws_access, self.region))
 
     def access_key(self):
         return self.aws_access
@@ -38,63 +176,343 @@ class aws(object):
     def secret_key(self):
         return self.aws_secret
 
+    def connect(self, service, access_key=None, secret_key=None,
+                security_token=None):
+        """
+        Shared connection to service in this region, using this object's
+        credentials unless others (eg. an assumed role) are given
+        """
+        if not access_key:
+            access_key = self.access_key()
+            secret_key = self.secret_key()
+        return connections.get_connection(service, self.region,
+                                          access_key=access_key,
+                                          secret_key=secret_key,
+                                          security_token=security_token)
+
     def validate_version(self, version):
-        if LooseVersion(boto.Version) < LooseVersion(version):
-            return False
-        return True
+        if version not in _validated_versions:
+            from distutils.version import LooseVersion
+            _validated_versions[version] = \
+                LooseVersion(load_boto().Version) >= LooseVersion(version)
+        return _validated_versions[version]
+
+    def action_name(self, awsfunc):
+        """
+        Name the API action behind a boto method for per-action state
+        """
+        return getattr(awsfunc, '__name__', repr(awsfunc))
+
+    def owner_name(self, awsfunc):
+        """
+        Name the object owning a bound method when it is not a connection,
+        eg. the Route53 Zone behind zone.get_records
+        """
+        import boto.connection
+        owner = getattr(awsfunc, '__self__', None)
+        if owner is None or isinstance(owner,
+                                       boto.connection.AWSAuthConnection):
+            return None
+        return repr(owner)
+
+    def owner_credentials(self, awsfunc):
+        """
+        Name the credentials of the connection behind a boto method, so
+        reads through different (eg. assumed role) connections never share
+        a result.  Security tokens are hashed, never kept in a key.
+        """
+        import boto.connection
+        owner = getattr(awsfunc, '__self__', None)
+        conn = owner
+        if not isinstance(conn, boto.connection.AWSAuthConnection):
+            # eg. a Route53 Zone keeps the connection it was fetched with
+            conn = getattr(owner, 'route53connection', None) or \
+                getattr(owner, 'connection', None)
+        provider = getattr(conn, 'provider', None)
+        if provider is None:
+            return (self.aws_access, None)
+        token = provider.security_token
+        if token:
+            token = hashlib.sha1(token).hexdigest()
+        return (provider.access_key, token)
+
+    def endpoint_name(self, awsfunc):
+        """
+        Name the service endpoint behind a boto method for circuit breaking
+        """
+        owner = getattr(awsfunc, '__self__', None)
+        host = getattr(owner, 'host', None)
+        if not host:
+            host = owner.__class__.__name__ if owner else 'unknown'
+        return (host, self.region)
 
     def wrap(self, awsfunc, *args, **nargs):
         """
         Wrap AWS call with Rate-Limiting backoff
         Gratefully taken Netflix/security_monkey
+
+        Every attempt draws a token from the account/region limiter, and
+        Throttling responses slow down the limiter for all backends.  Retry
+        backoff is tracked per API action with decorrelated jitter.  Each
+        call is recorded in the process-wide API statistics.
+
+        Endpoints that keep failing as unavailable open a circuit breaker,
+        raising breaker.CircuitOpenError without calling AWS until a probe
+        call succeeds again.
+
+        Identical reads in flight together, or within a short window, share
+        one call.  Any other call forgets the shared reads for the region.
+
+        With hedging enabled (hedge.set_enabled) reads slower than their
+        observed p95 latency are sent twice and the first answer is used.
+        Both requests draw from the limiter.  Reads are not hedged while the
+        limiter or the action's backoff are throttled.
+
+        Under an active deadline.deadline backoff sleeps are clipped to the
+        time remaining, and the last error is raised rather than retrying
+        past it.
         """
-        attempts = 0
+        action = self.action_name(awsfunc)
+        flights = singleflight.get_flights()
 
-        while True:
-            attempts = attempts + 1
+        if not singleflight.is_read(action):
             try:
-                if self.rate_limit_delay > 0:
-                    time.sleep(self.rate_limit_delay)
-
-                retval = awsfunc(*args, **nargs)
-
-                if self.rate_limit_delay > 0:
-                    self.rate_limit_delay = self.rate_limit_delay / 2
-
-                return retval
-
-            except BotoServerError as e:
-                if e.error_code == 'Throttling':
-                    if self.rate_limit_delay == 0:
-                        self.rate_limit_delay = 1
-                        sys.stderr.write('rate-limited: attempt %d\n' %
-                                         attempts)
-                    elif self.rate_limit_delay < self.rate_limit_maxdelay:
-                        self.rate_limit_delay = self.rate_limit_delay * 2
-                        sys.stderr.write('rate-limited: attempt %d\n' %
-                                         attempts)
+                return self.__wrap(action, awsfunc, *args, **nargs)
+            finally:
+                flights.forget(self.region)
+
+        key = flights.key(self.region, action,
+                          (self.owner_credentials(awsfunc),
+                           self.owner_name(awsfunc)),
+                          args, nargs)
+        (retval, shared) = flights.do(
+            key, self.region,
+            lambda: self.__hedged(action, awsfunc, *args, **nargs),
+            reuse=not getattr(_fresh, 'active', False))
+        if shared:
+            stats.get_stats().record_shared(action, self.region)
+        return retval
+
+    def __hedged(self, action, awsfunc, *args, **nargs):
+        """
+        __wrap a read call, duplicating it once it runs slower than usual
+        when hedging is enabled
+        """
+        # a throttled action is not hedged, that only adds to the throttling
+        if not hedge.enabled() or self.limiter.throttling() or \
+                self.backoff.delay(action) > 0:
+            return self.__wrap(action, awsfunc, *args, **nargs)
+
+        # attempts run on their own threads, with the caller's context
+        level = getattr(_priority, 'level', None)
+        budget = deadline.current() or deadline.deadline()
+
+        def attempt():
+            _priority.level = level
+            with budget.active():
+                return self.__wrap(action, awsfunc, *args, **nargs)
+
+        (retval, hedged, won) = hedge.get_hedger().call(
+            (self.region, action), attempt)
+        if hedged:
+            stats.get_stats().record_hedged(action, self.region, won)
+        return retval
+
+    def __wrap(self, action, awsfunc, *args, **nargs):
+        # boto, and breaker built on it, are loaded on first call
+        from boto.exception import BotoServerError
+        from . import breaker
+        attempts = 0
+        slept = 0.0
+        throttled = False
+        success = False
+        starttime = time.time()
+        budget = deadline.current()
+        probe = False
+        # this call's own backoff, bounding its retries
+        retry = 0.0
+        # replayed calls never reach AWS: they never wait, and leave the
+        # live limiter, backoff and breaker state alone
+        tape = cassette.get_cassette()
+        replaying = tape is not None and tape.replaying
+        if replaying:
+            circuit = breaker.nullBreaker()
+        else:
+            circuit = breaker.get_breaker(self.endpoint_name(awsfunc))
+
+        try:
+            while True:
+                attempts = attempts + 1
+                probe = circuit.allow()
+                delay = max(self.rate_limit_delay, self.backoff.delay(action),
+                            retry)
+                if budget:
+                    delay = budget.clip(delay)
+                if delay > 0 and not replaying:
+                    time.sleep(delay)
+                    slept += delay
+
+                try:
+                    if not replaying:
+                        slept += self.limiter.acquire(
+                            priority=current_priority(action))
+                    calltime = time.time()
+                    retval = self.__call(action, awsfunc, *args, **nargs)
+                    if not replaying:
+                        if hedge.enabled() and singleflight.is_read(action):
+                            hedge.get_hedger().record(
+                                (self.region, action), time.time() - calltime)
+                        self.limiter.success()
+                        self.backoff.success(action)
+                    circuit.success()
+
+                    success = True
+                    return retval
+
+                except BotoServerError as e:
+                    if e.error_code in THROTTLE_CODES:
+                        circuit.success()
+                        if not replaying:
+                            self.limiter.throttled()
+                        throttled = True
+                        reason = 'rate-limited'
+                    elif e.error_code in UNAVAILABLE_CODES:
+                        circuit.failure()
+                        reason = 'api-unavailable'
                     else:
+                        # the endpoint answered, it is reachable
+                        circuit.success()
                         raise e
 
-                elif e.error_code == 'ServiceUnavailable':
-                    if self.rate_limit_delay == 0:
-                        self.rate_limit_delay = 1
-                        sys.stderr.write('api-unavailable: attempt %d\n' %
-                                         attempts)
-                    elif self.rate_limit_delay < self.rate_limit_maxdelay:
-                        self.rate_limit_delay = self.rate_limit_delay * 2
-                        sys.stderr.write('api-unavailable: attempt %d\n' %
-                                         attempts)
-                    else:
+                    if not replaying:
+                        self.backoff.failure(action, self.rate_limit_maxdelay)
+                    if retry >= self.rate_limit_maxdelay:
+                        raise e
+                    retry = self.backoff.grow(retry, self.rate_limit_maxdelay)
+                    if budget and not replaying and budget.remaining() < \
+                            max(retry, self.backoff.delay(action)):
+                        # retrying would sleep past the deadline
                         raise e
-                else:
-                    raise e
+                    sys.stderr.write('%s: %s attempt %d\n' %
+                                     (reason, action, attempts))
+
+                except (socket.error, httplib.HTTPException):
+                    circuit.failure()
+                    raise
+        finally:
+            if probe:
+                # a no-op unless the probe ended in some other exception
+                circuit.release()
+            stats.get_stats().record(action, self.region,
+                                     time.time() - starttime,
+                                     retries=attempts - 1,
+                                     slept=slept,
+                                     throttled=throttled,
+                                     error=not success)
+
+    def __call(self, action, awsfunc, *args, **nargs):
+        """
+        Invoke awsfunc, through the record/replay cassette when one is set
+        """
+        tape = cassette.get_cassette()
+        if tape:
+            return tape.call(action, self.region, awsfunc, *args, **nargs)
+        return awsfunc(*args, **nargs)
+
+    def wrap_many(self, calls, ordered=True, workers=None):
+        """
+        Run independent AWS calls concurrently through wrap()
+
+        calls is a list of (awsfunc, args, nargs) tuples, args and nargs are
+        optional.  Calls run on a bounded pool of worker threads sharing the
+        same rate limiter and backoff as wrap().
+
+        ordered=True returns a list of results in call order.  ordered=False
+        returns a generator of (index, result) as calls complete.  The first
+        exception raised by a call is re-raised to the caller.
+        """
+        calls = [self.__expand_call(c) for c in calls]
+        if ordered:
+            results = [None] * len(calls)
+            for i, r in self.__run_many(calls, workers):
+                results[i] = r
+            return results
+        return self.__run_many(calls, workers)
+
+    def __expand_call(self, call):
+        if callable(call):
+            return (call, (), {})
+        call = tuple(call)
+        awsfunc = call[0]
+        args = call[1] if len(call) > 1 and call[1] else ()
+        nargs = call[2] if len(call) > 2 and call[2] else {}
+        return (awsfunc, args, nargs)
+
+    def __run_many(self, calls, workers=None):
+        if not calls:
+            return
+
+        if not workers:
+            workers = self.workers
+        workers = max(1, min(workers, len(calls)))
+
+        pending = Queue.Queue()
+        done = Queue.Queue()
+        for i, c in enumerate(calls):
+            pending.put((i, c))
+
+        # workers inherit the caller's priority, deadline and freshness
+        level = getattr(_priority, 'level', None)
+        fresh = getattr(_fresh, 'active', False)
+        budget = deadline.current() or deadline.deadline()
+
+        def worker():
+            _priority.level = level
+            _fresh.active = fresh
+            while True:
+                try:
+                    i, (awsfunc, args, nargs) = pending.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    with budget.active():
+                        retval = self.wrap(awsfunc, *args, **nargs)
+                    done.put((i, True, retval))
+                except Exception:
+                    done.put((i, False, sys.exc_info()))
+
+        for n in range(workers):
+            t = threading.Thread(target=worker)
+            t.daemon = True
+            t.start()
+
+        for n in range(len(calls)):
+            # poll so SIGINT is still delivered to the main thread
+            while True:
+                try:
+                    i, ok, result = done.get(True, 1)
+                    break
+                except Queue.Empty:
+                    continue
+            if not ok:
+                # drain remaining work so idle workers exit
+                while True:
+                    try:
+                        pending.get_nowait()
+                    except Queue.Empty:
+                        break
+                raise result[0], result[1], result[2]
+            yield (i, result)
 
     def instance_info(self):
-        identity = boto.utils.get_instance_identity(timeout=60,
-                                                    num_retries=5)
-        self.info['instanceId'] = identity['document'][u'instanceId']
-        self.info['availabilityZone'] = \
-            identity['document'][u'availabilityZone']
-        self.info['region'] = identity['document'][u'region']
+        """
+        instanceId, availabilityZone and region of the instance we run on,
+        None when not on EC2
+        """
+        document = identity.get_identity()
+        if not document:
+            return None
+        self.info = dict()
+        for k in ['instanceId', 'availabilityZone', 'region']:
+            self.info[k] = document.get(k)
         return self.info
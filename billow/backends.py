@@ -0,0 +1,38 @@
+"""
+billow lazy backends
+
+Backends (and the boto modules behind them) are only built the first time
+they are used.  Objects with a parent share the parent's backend.
+"""
+import importlib
+
+
+class backend(object):
+
+    """
+    Descriptor for a backend attribute, eg. asg = backend('asg')
+
+    On first access use parent.<name> when the object has a parent, otherwise
+    build billow.<name>.<name>(self.region).  Assignment overrides it.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.attr = '_backend_%s' % name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        b = obj.__dict__.get(self.attr)
+        if b is None:
+            parent = getattr(obj, 'parent', None)
+            if parent is not None and hasattr(parent, self.name):
+                b = getattr(parent, self.name)
+            else:
+                module = importlib.import_module('billow.%s' % self.name)
+                b = getattr(module, self.name)(obj.region)
+            obj.__dict__[self.attr] = b
+        return b
+
+    def __set__(self, obj, value):
+        obj.__dict__[self.attr] = value
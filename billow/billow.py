@@ -1,8 +1,3 @@
-from . import asg
-from . import dns
-from . import elb
-from . import sec
-import boto
 from .billowBalancer import billowBalancer
 from .billowCloud import billowCloud
 from .billowConfig import billowConfig
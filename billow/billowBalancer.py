@@ -1,8 +1,4 @@
-from . import asg
-from . import dns
-from . import elb
-from . import sec
-import boto
+from . import backends
 import datetime
 import billow
 
@@ -13,6 +9,11 @@ class billowBalancer(object):
     Load Balancer fronting a Group
     """
 
+    # Backends, built on first use
+    elb = backends.backend('elb')
+    sec = backends.backend('sec')
+    vpc = backends.backend('vpc')
+
     def __init__(self, name, region='us-east-1', parent=None):
         self.__name = name
         self.region = region
@@ -23,16 +24,6 @@ class billowBalancer(object):
         self.parent = parent
         self.update_time = None
 
-        # Backends
-        if self.parent:
-            self.elb = self.parent.elb
-            self.sec = self.parent.sec
-            self.vpc = self.parent.vpc
-        else:
-            self.elb = elb.elb(self.region)
-            self.sec = sec.sec(self.region)
-            self.vpc = vpc.vpc(self.region)
-
     def config(self):
         self.__load()
 
@@ -56,9 +47,7 @@ class billowBalancer(object):
         elb['health']['unhealthy'] = e.health_check.unhealthy_threshold
         if e.scheme == u'internal':
             elb['internal'] = True
-        elb['subnets'] = list()
-        for s in e.subnets:
-            elb['subnets'].append(self.vpc.subnet_name(s))
+        elb['subnets'] = self.vpc.subnet_names(list(e.subnets))
 
         elb['policies'] = dict()
         if e.policies.app_cookie_stickiness_policies:
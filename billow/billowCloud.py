@@ -1,9 +1,8 @@
-from . import asg
-from . import dns
-from . import elb
-from . import sec
-import boto
+from . import aws
 from .billowRegion import billowRegion
+import httplib
+import socket
+import sys
 
 
 class billowCloud(object):
@@ -21,23 +20,57 @@ class billowCloud(object):
             self.regions.append(billowRegion(region=r, parent=self))
 
         self.services = list()
+        self.partial = list()
+
+    def degraded(self, region, e):
+        """
+        Skip a region whose endpoints are unavailable or unreachable,
+        remembering that the results are partial
+        """
+        if isinstance(e, (socket.error, httplib.HTTPException)):
+            reason = str(e) or e.__class__.__name__
+        elif e.error_code == 'CircuitOpen' or \
+                e.error_code in aws.UNAVAILABLE_CODES:
+            reason = e.error_code
+        else:
+            raise e
+        sys.stderr.write('region %s unavailable, results partial: %s\n' %
+                         (region.region, reason))
+        if region.region not in self.partial:
+            self.partial.append(region.region)
 
     def list_services(self):
+        return list(self.iter_services())
+
+    def iter_services(self):
+        """
+        iterate over services, each region's as soon as it is listed
+        """
+        from boto.exception import BotoServerError
         self.services = list()
+        self.partial = list()
         for r in self.regions:
-            self.add_services(r.list_services())
-        return self.services
+            try:
+                services = r.list_services()
+            except (BotoServerError, socket.error, httplib.HTTPException) as e:
+                self.degraded(r, e)
+                continue
+            self.add_services(services)
+            for s in services:
+                yield s
 
     def add_services(self, services):
         for v in services:
             self.services.append(v)
 
     def get_service(self, services, region=None):
+        from boto.exception import BotoServerError
         if not services:
             return list()
         if not isinstance(services, list):
             services = [services]
         out = list()
+        self.partial = list()
 
         for s in services:
             if ':' in s:
@@ -48,7 +81,12 @@ class billowCloud(object):
             for r in self.regions:
                 if region and r.region != region:
                     continue
-                svc = r.get_service(s)
+                try:
+                    svc = r.get_service(s)
+                except (BotoServerError, socket.error,
+                        httplib.HTTPException) as e:
+                    self.degraded(r, e)
+                    continue
                 out.extend(svc)
 
         return out
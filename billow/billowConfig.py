@@ -1,5 +1,4 @@
-from . import asg
-import boto
+from . import backends
 import datetime
 import re
 
@@ -12,6 +11,9 @@ class billowConfig(object):
     LaunchConfig on Amazon
     """
 
+    # Backends, built on first use
+    asg = backends.backend('asg')
+
     # BLOCK DEVICE MAPPINGS - http://aws.amazon.com/ec2/instance-types/
     blockdevmap = {
         'c1.medium': 1,
@@ -57,11 +59,6 @@ class billowConfig(object):
         self.region = region
         self.parent = parent
 
-        if self.parent:
-            self.asg = self.parent.asg
-        else:
-            self.asg = asg.asg(self.region)
-
     def search(self, regex):
         """
         Search config list by regex
@@ -1,5 +1,4 @@
-from . import dns
-import boto
+from . import backends
 import datetime
 
 
@@ -14,6 +13,9 @@ class billowEndpoint(object):
     specific records by record name.
     """
 
+    # Backends, built on first use
+    dns = backends.backend('dns')
+
     def __init__(self, zones, region):
         if not isinstance(zones, list):
             zones = [zones]
@@ -24,8 +26,6 @@ class billowEndpoint(object):
         self.reverse = dict()
         self.rawzones = None
 
-        self.dns = dns.dns(region)
-
         for z in self.zones[:]:
             if z.endswith('.'):
                 z = z[:-1]
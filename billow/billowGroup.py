@@ -1,8 +1,5 @@
-from . import asg
-from . import dns
-from . import elb
-from . import sec
-import boto
+from . import backends
+import collections
 import datetime
 import billow
 import json
@@ -14,13 +11,24 @@ class billowGroup(object):
     a large undulating mass of cloud services
     """
 
+    # recent scaling activities kept per group
+    event_history = 100
+
+    # Backends, built on first use
+    asg = backends.backend('asg')
+    dns = backends.backend('dns')
+    elb = backends.backend('elb')
+    sec = backends.backend('sec')
+    vpc = backends.backend('vpc')
+
     def __init__(self, group, region='us-east-1', parent=None):
         self.group = group
         self.rawgroup = None
         self.rawconfig = None
         self.rawinstances = None
         self.rawstatus = None
-        self.rawevents = None
+        self.rawevents = collections.deque(maxlen=self.event_history)
+        self.events_tailed = None
         self.__region = region
         self.__service = None
         self.__environ = None
@@ -29,20 +37,6 @@ class billowGroup(object):
         self.update_time = None
         self.settings = dict()
 
-        # Backends
-        if self.parent:
-            self.asg = self.parent.asg
-            self.dns = self.parent.dns
-            self.elb = self.parent.elb
-            self.sec = self.parent.sec
-            self.vpc = self.parent.vpc
-        else:
-            self.asg = asg.asg(self.region)
-            self.dns = dns.dns(self.region)
-            self.elb = elb.elb(self.region)
-            self.sec = sec.sec(self.region)
-            self.vpc = vpc.vpc(self.region)
-
         self.tagservice = 'service'
         self.tagenviron = 'env'
         self.tagcluster = 'cluster'
@@ -68,9 +62,7 @@ class billowGroup(object):
         self.__config['size']['min'] = self.min_size
         self.__config['size']['max'] = self.max_size
 
-        self.__config['subnets'] = list()
-        for s in self.subnets:
-            self.__config['subnets'].append(self.vpc.subnet_name(s))
+        self.__config['subnets'] = self.vpc.subnet_names(self.subnets)
         self.__config['public'] = self.public
         if self.placement_group:
             self.__config['placement_group'] = self.placement_group
@@ -134,6 +126,10 @@ class billowGroup(object):
             self.cluster == other.cluster
 
     def __load(self, refresh=False):
+        if not self.rawgroup and not refresh and self.parent:
+            # load sibling groups in bulk, see asg.load_groups
+            self.parent.load_groups()
+
         if not self.rawgroup or refresh:
             self.rawgroup = None
 
@@ -205,9 +201,58 @@ class billowGroup(object):
         if not self.rawstatus:
             self.rawstatus = self.asg.get_instance_status(instids)
 
-    def __load_events(self, refresh=False):
-        if not self.rawevents or refresh:
-            self.rawevents = self.asg.list_activities(self.group)
+    def __load_events(self):
+        """
+        Tail the group's scaling activities into the rawevents ring buffer,
+        newest first, fetching only activities newer than the newest
+        finished one seen, or still in progress.  A tail within the
+        activities ttl of the last one is skipped.
+        """
+        tailed = self.asg.activities_tailed(self.group)
+        if tailed is not None and tailed == self.events_tailed:
+            return list()
+
+        position = dict()
+        for i, e in enumerate(self.rawevents):
+            position[e.activity_id] = i
+
+        new = list()
+        for a in self.asg.tail_activities(self.group, known=self.rawevents,
+                                          limit=self.event_history):
+            if a.activity_id in position:
+                self.rawevents[position[a.activity_id]] = a
+            else:
+                new.append(a)
+        self.events_tailed = self.asg.activities_tailed(self.group)
+
+        if new:
+            started = lambda e: e.start_time or datetime.datetime.min
+            new.sort(key=started, reverse=True)
+            events = sorted(new + list(self.rawevents), key=started,
+                            reverse=True)
+            self.rawevents = collections.deque(events[:self.event_history],
+                                               maxlen=self.event_history)
+
+        return new
+
+    def tail_events(self):
+        """
+        Events new since the last call, oldest first, to follow a group
+        """
+        return [self.__event(e) for e in reversed(self.__load_events())]
+
+    def __event(self, e):
+        return {
+                'start_time': e.start_time,
+                'end_time': e.end_time,
+                'id': e.activity_id,
+                'progress': e.progress,
+                'status': e.status_code,
+                'description': e.description,
+                'cause': e.cause,
+                'status_message': e.status_message,
+                'group': e.group_name
+                }
 
     def refresh(self):
         self.__load(refresh=True)
@@ -220,6 +265,15 @@ class billowGroup(object):
         self.rawgroup = rawgroup
         self.__load()
 
+    def want_instances(self):
+        """
+        Let instance lookups for this group ride along with other groups',
+        when they are about to be read
+        """
+        self.__load()
+        self.asg.want_instances(
+            [i.instance_id for i in self.rawgroup.instances])
+
     def refresh(self):
         self.rawgroup = None
         self.__load()
@@ -372,6 +426,12 @@ class billowGroup(object):
 
     @property
     def instances(self):
+        return self.get_instances()
+
+    def get_instances(self, fresh=False):
+        """
+        Group instances, fresh reads skip the region instance index
+        """
         self.__load()
         instances = list()
         ids = list()
@@ -390,7 +450,8 @@ class billowGroup(object):
         if not instances:
             return list()
 
-        self.rawinstances = self.asg.get_instance(ids)
+        self.rawinstances = self.asg.get_group_instances(self.group, ids,
+                                                         fresh=fresh)
         for ri in self.rawinstances:
             for i in instances:
                 if i.id == ri.id:
@@ -453,22 +514,12 @@ class billowGroup(object):
 
     @property
     def events(self):
+        """
+        Recent events, newest first, brought up to date incrementally at
+        most once per activities ttl
+        """
         self.__load_events()
-        events = list()
-        for e in self.rawevents:
-            event = {
-                    'start_time': e.start_time,
-                    'end_time': e.end_time,
-                    'id': e.activity_id,
-                    'progress': e.progress,
-                    'status': e.status_code,
-                    'description': e.description,
-                    'cause': e.cause,
-                    'status_message': e.status_message,
-                    'group': e.group_name
-                    }
-            events.append(event)
-        return events
+        return [self.__event(e) for e in self.rawevents]
 
     # addrs
     # aminame
@@ -1,5 +1,4 @@
-from . import asg
-import boto
+from . import backends
 import datetime
 import re
 
@@ -12,22 +11,21 @@ class billowImage(object):
     AMI on Amazon
     """
 
+    # Backends, built on first use
+    asg = backends.backend('asg')
+
     def __init__(self, region='us-east-1', parent=None):
         self.region = region
         self.parent = parent
 
-        if self.parent:
-            self.asg = self.parent.asg
-        else:
-            self.asg = asg.asg(self.region)
-
     def find_name_regex(self, regex, amis):
+        pattern = re.compile(regex)
         amilist = list()
         for a in amis:
             if str(a.name) == regex:
                 amilist.append(a)
                 continue
-            if re.match(regex, str(a.name)):
+            if pattern.match(str(a.name)):
                 amilist.append(a)
         return amilist
 
@@ -35,9 +33,9 @@ class billowImage(object):
         """
         Search ami list, then filter result by regex
         """
+        # the region image catalog answers name matches sorted by name
         amis = self.asg.match_images_name(name)
         if amis:
-            amis = sorted(amis, key=lambda a: a.name, reverse=False)
             if regex:
                 return self.find_name_regex(regex, amis)
             return amis
@@ -63,7 +61,7 @@ class billowImage(object):
         for f, r in formats:
             amis = self.asg.match_images_name(f)
             if amis:
-                amis = sorted(amis, key=lambda a: a.name, reverse=True)
+                amis.reverse()
                 amilist.extend(self.find_name_regex(r, amis))
 
         return amilist
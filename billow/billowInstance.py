@@ -1,6 +1,4 @@
-from . import asg
 import billow
-import boto
 
 class billowInstance(object):
     """
@@ -95,6 +93,7 @@ class billowInstance(object):
         """
         instance is boto.ec2.autoscale.Instance
         """
+        import boto.ec2.autoscale
         if not isinstance(instance, boto.ec2.autoscale.Instance):
             raise TypeError
         self.group_health = instance.health_status
@@ -106,6 +105,7 @@ class billowInstance(object):
         """
         instance is boto.ec2.Instance
         """
+        import boto.ec2.instance
         if not isinstance(instance, boto.ec2.instance.Instance):
             raise TypeError
         self.architecture = instance.architecture
@@ -168,6 +168,7 @@ class billowInstance(object):
         """
         instance is boto.ec2.elb.instancestate.InstanceState
         """
+        import boto.ec2.elb.instancestate
         if not isinstance(instance, boto.ec2.elb.instancestate.InstanceState):
             raise TypeError
         self.balancer_state = instance.state
@@ -181,6 +182,7 @@ class billowInstance(object):
             instance-reboot | instance-retirement | instance-stop
             system-reboot | system-maintenance
         """
+        import boto.ec2.instancestatus
         if not isinstance(status, boto.ec2.instancestatus.InstanceStatus):
             raise TypeError
         self.hardware_status = status.system_status.status
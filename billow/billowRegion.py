@@ -1,9 +1,5 @@
-from . import asg
-from . import dns
-from . import elb
-from . import sec
-from . import vpc
-import boto
+from . import backends
+import collections
 import sys
 from .billowService import billowService
 from .billowGroup import billowGroup
@@ -15,59 +11,49 @@ class billowRegion(object):
     a large undulating mass of cloud services
     """
 
+    # Backends, built on first use
+    asg = backends.backend('asg')
+    dns = backends.backend('dns')
+    elb = backends.backend('elb')
+    sec = backends.backend('sec')
+    vpc = backends.backend('vpc')
+
     def __init__(self, region='us-east-1', parent=None):
         self.region = region
         self.parent = parent
         self.services = list()
-
-        # Backends
-        self.asg = asg.asg(self.region)
-        self.dns = dns.dns(self.region)
-        self.elb = elb.elb(self.region)
-        self.sec = sec.sec(self.region)
-        self.vpc = vpc.vpc(self.region)
+        # service to environ to billowService, in discovery order.  One
+        # service per service and environ, add_service reuses it.
+        self.by_service = dict()
 
         self.tagservice = 'service'
         self.tagenviron = 'env'
         self.servicetags = [self.tagenviron, self.tagservice]
 
     def find_service(self, service, environ=None):
-        o = list()
-        for s in self.services:
-            if s.service == service:
-                if environ:
-                    if s.environ == environ:
-                        o.append(s)
-                    continue
-                o.append(s)
+        environs = self.by_service.get(service, dict())
+        if environ:
+            if environ in environs:
+                return [environs[environ]]
+            return list()
 
-        return o
+        return environs.values()
 
     def list_services(self):
         self.services = list()
-        servicenames = dict()
-        tags = self.asg.list_tags(tag=self.servicetags)
-
-        # service
-        for t in tags:
-            if t.key == self.tagservice:
-                servicenames[t.resource_id] = {'service': t.value}
-
-        # environ
-        for t in tags:
-            if t.key == self.tagenviron:
-                if t.resource_id not in servicenames:
-                    servicenames[t.resource_id] = dict()
-                servicenames[t.resource_id]['environ'] = t.value
-
-        for k, v in servicenames.iteritems():
-            if 'service' not in v:
+        self.by_service = dict()
+
+        # service and environ from the region tag index
+        for k, v in sorted(self.asg.tag_index.groups().iteritems()):
+            if self.tagservice not in v and self.tagenviron not in v:
+                continue
+            if self.tagservice not in v:
                 sys.stderr.write("group %s missing service tag\n" % k)
                 continue
-            if 'environ' not in v:
+            if self.tagenviron not in v:
                 sys.stderr.write("group %s missing environ tag\n" % k)
                 continue
-            self.add_service(v['service'], v['environ'], group=k)
+            self.add_service(v[self.tagservice], v[self.tagenviron], group=k)
 
         return self.services
 
@@ -81,17 +67,24 @@ class billowRegion(object):
                 environ=environ,
                 parent=self)
             self.services.append(s)
+            self.by_service.setdefault(
+                service, collections.OrderedDict())[environ] = s
             slist = [s]
 
-        if len(slist) > 1:
-            sys.stderr.write("ignoring multiple services found for %s/%s\n" % \
-                    (service, environ))
-
         if group:
             slist[0].add_group(group)
 
         return slist[0]
 
+    def load_groups(self):
+        """
+        Bulk load every service's groups in the region, see asg.load_groups
+        """
+        groups = list()
+        for s in self.services:
+            groups.extend(s.groups)
+        return self.asg.load_groups(groups)
+
     def canon_service(self, service):
         if ':' in service:
             return service.split(':')[0]
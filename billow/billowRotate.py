@@ -1,7 +1,6 @@
-from . import asg
 import billow
-import boto
-from boto.exception import BotoServerError
+from . import aws
+from . import deadline
 from contextlib import closing
 import itertools
 import json
@@ -44,6 +43,7 @@ class billowRotate(object):
         5. Check instances for secondary Private IPs and multi-subnet
         """
         warnings = list()
+        self.service.want_instances()
         for g in self.service.groups:
             instances = g.instances
 
@@ -115,6 +115,7 @@ class billowRotate(object):
         self.instances = list()
         degraded = list()
         instances = list()
+        self.service.want_instances()
 
         # 1. UnHealthy Group instances
         for g in self.service.groups:
@@ -160,31 +161,24 @@ class billowRotate(object):
                 return i
         return None
 
-    def find_group_instance(self, group, instance_id):
-        for i in group.instances:
+    def find_group_instance(self, group, instance_id, fresh=False):
+        for i in group.get_instances(fresh=fresh):
             if i.id == instance_id:
                 return i
         return None
 
-    def wait_timeout(self, timeout, starttime):
-        waittime = timeout - (time.time() - starttime)
-        if waittime <= 0:
-            self.log('timed out, aborting')
-            return 0
-        return waittime
-
+    @aws.polling
+    @aws.prioritized(aws.PRIORITY_LOW)
+    @deadline.bounded
     def wait_elb_registered(self, instance_id, sleep=5, timeout=None):
         """
         Wait for instance to become registered to balancer
         Registration means 'InService' or 'OutOfService'
         Ignore 'Unknown' and consider it unregistered in Unknown state
         """
-        starttime = 0
-        if timeout:
-            if timeout < 0:
-                self.log('timed out waiting for balancer registration')
-                return False
-            starttime = time.time()
+        if timeout.expired():
+            self.log('timed out waiting for balancer registration')
+            return False
 
         healthy = False
         while not healthy:
@@ -217,7 +211,7 @@ class billowRotate(object):
             if healthycnt == len(group.load_balancers):
                 return True
 
-            if timeout and (time.time() - starttime) > timeout:
+            if timeout.expired():
                 self.log('timed out waiting for instance %s balancer ' \
                         'deregistration' % instance_id)
                 return False
@@ -226,7 +220,7 @@ class billowRotate(object):
                 timeoutstr = ''
                 if timeout:
                     timeoutstr = ' timeout %ds' \
-                            % int(timeout - (time.time() - starttime))
+                            % int(timeout.remaining())
                 self.log('sleeping %ds waiting for instance %s to register ' \
                         'with %d/%d balancers%s' % (
                             sleep,
@@ -235,21 +229,21 @@ class billowRotate(object):
                             len(group.load_balancers),
                             timeoutstr)
                         )
-                time.sleep(sleep)
+                timeout.sleep(sleep)
 
         return True
 
+    @aws.polling
+    @aws.prioritized(aws.PRIORITY_LOW)
+    @deadline.bounded
     def wait_elb_deregistered(self, instance_id, sleep=5, timeout=None):
         """
         Wait for instance to deregister from balancer
         Consider 'Unknown' as deregistered
         """
-        starttime = 0
-        if timeout:
-            if timeout < 0:
-                self.log('timed out waiting for balancer deregistration')
-                return False
-            starttime = time.time()
+        if timeout.expired():
+            self.log('timed out waiting for balancer deregistration')
+            return False
 
         healthy = True
         while healthy:
@@ -295,7 +289,7 @@ class billowRotate(object):
             if unhealthycnt == len(group.load_balancers):
                 return True
 
-            if timeout and (time.time() - starttime) > timeout:
+            if timeout.expired():
                 self.log('timed out waiting for instance %s balancer ' \
                         'deregistration' % instance_id)
                 return False
@@ -304,7 +298,7 @@ class billowRotate(object):
                 timeoutstr = ''
                 if timeout:
                     timeoutstr = ' timeout %ds' \
-                            % int(timeout - (time.time() - starttime))
+                            % int(timeout.remaining())
                 drainstr = ''
                 if drainmax:
                     drainstr = ' draining connections %ds' % drainmax
@@ -317,16 +311,18 @@ class billowRotate(object):
                             timeoutstr,
                             drainstr)
                         )
-                time.sleep(sleep)
+                timeout.sleep(sleep)
 
         return True
 
+    @aws.polling
+    @aws.prioritized(aws.PRIORITY_LOW)
+    @deadline.bounded
     def wait_elb_healthy(self, instance_id, sleep=5, timeout=None):
         starttime = time.time()
-        if timeout:
-            if timeout < 0:
-                self.log('timed out waiting for balancer health check')
-                return False
+        if timeout.expired():
+            self.log('timed out waiting for balancer health check')
+            return False
 
         healthchecks = dict()
         healthtimes = dict()
@@ -365,7 +361,7 @@ class billowRotate(object):
             if healthycnt == len(group.load_balancers):
                 return True
 
-            if timeout and (time.time() - starttime) > timeout:
+            if timeout.expired():
                 self.log('timed out waiting for instance %s health check' \
                         % instance_id)
                 return False
@@ -374,7 +370,7 @@ class billowRotate(object):
                 timeoutstr = ''
                 if timeout:
                     timeoutstr = ' timeout %ds' \
-                            % int(timeout - (time.time() - starttime))
+                            % int(timeout.remaining())
                 self.log('sleeping %ds waiting for instance %s health check ' \
                         'with %d/%d balancers%s' % (
                             sleep,
@@ -389,20 +385,20 @@ class billowRotate(object):
                         self.log('instance %s failing balancer %s health ' \
                                 'check %s' \
                                 % (instance_id, balancer_name, target))
-                time.sleep(sleep)
+                timeout.sleep(sleep)
 
         return True
 
+    @aws.polling
+    @aws.prioritized(aws.PRIORITY_LOW)
+    @deadline.bounded
     def wait_group_terminated(self, instance_id, sleep=5, timeout=None):
         """
         Wait for instance to terminate from group
         """
-        starttime = 0
-        if timeout:
-            if timeout < 0:
-                self.log('timed out waiting for instance group termination')
-                return False
-            starttime = time.time()
+        if timeout.expired():
+            self.log('timed out waiting for instance group termination')
+            return False
 
         healthy = True
         while healthy:
@@ -415,7 +411,8 @@ class billowRotate(object):
             # Refresh Group info
             group.refresh()
 
-            instance = self.find_group_instance(group, instance_id)
+            instance = self.find_group_instance(group, instance_id,
+                                                fresh=True)
             if not instance:
                 return True
 
@@ -423,7 +420,7 @@ class billowRotate(object):
                     instance.instance_state == 'terminated':
                 return True
 
-            if timeout and (time.time() - starttime) > timeout:
+            if timeout.expired():
                 self.log('timed out waiting for instance %s termination ' \
                         'from group %s' % (instance_id, group.name))
                 return False
@@ -431,7 +428,7 @@ class billowRotate(object):
             timeoutstr = ''
             if timeout:
                 timeoutstr = ' timeout %ds' \
-                        % int(timeout - (time.time() - starttime))
+                        % int(timeout.remaining())
             self.log('sleeping %ds waiting for instance %s in state %s to ' \
                     'terminate from group %s%s' % (
                         sleep,
@@ -440,10 +437,13 @@ class billowRotate(object):
                         group.name,
                         timeoutstr)
                     )
-            time.sleep(sleep)
+            timeout.sleep(sleep)
 
         return True
 
+    @aws.polling
+    @aws.prioritized(aws.PRIORITY_LOW)
+    @deadline.bounded
     def wait_group_launched(self, group, instances,
             count=1, sleep=5, timeout=None):
         """
@@ -452,12 +452,9 @@ class billowRotate(object):
         if not isinstance(instances, list):
             instances = [instances]
 
-        starttime = 0
-        if timeout:
-            if timeout < 0:
-                self.log('timed out waiting for instance group launch')
-                return False
-            starttime = time.time()
+        if timeout.expired():
+            self.log('timed out waiting for instance group launch')
+            return False
 
         healthy = False
         while not healthy:
@@ -469,7 +466,7 @@ class billowRotate(object):
             group.refresh()
 
             # Look for new instances not in previous list
-            for i in group.instances:
+            for i in group.get_instances(fresh=True):
                 if i.id not in instances:
                     # Warn when unexpectate state discovered
                     if (i.group_state == 'Terminated' or \
@@ -500,7 +497,7 @@ class billowRotate(object):
             if healthycnt >= count:
                 return healthyinstances
 
-            if timeout and (time.time() - starttime) > timeout:
+            if timeout.expired():
                 self.log('timed out waiting for instance start ' \
                         'from group %s' % group.name)
                 return False
@@ -508,7 +505,7 @@ class billowRotate(object):
             timeoutstr = ''
             if timeout:
                 timeoutstr = ' timeout %ds' \
-                        % int(timeout - (time.time() - starttime))
+                        % int(timeout.remaining())
             statestr = ''
             if healthytext:
                 statestr = ' in state %s' % healthytext
@@ -521,15 +518,16 @@ class billowRotate(object):
                         group.name,
                         timeoutstr)
                     )
-            time.sleep(sleep)
+            timeout.sleep(sleep)
 
         return list()
 
+    @deadline.bounded
     def wait_launch(self, group, instlist, timeout=None):
         """
         Wait for a newly launched instance to come into service
         """
-        if timeout and timeout < 0:
+        if timeout.expired():
             self.log('timed out waiting for instance launch')
             return False
 
@@ -563,11 +561,12 @@ class billowRotate(object):
             return False
 
         if wait:
-            if not self.wait_lauch(group, instlist, timeout=timeout):
+            if not self.wait_launch(group, instlist, timeout=timeout):
                 return False
 
         return True
 
+    @deadline.bounded
     def deregister(self, instance_id, wait=True, timeout=None):
         ret = True
         for b in self.service.balancers:
@@ -584,10 +583,8 @@ class billowRotate(object):
 
         return ret
 
+    @deadline.bounded
     def register(self, instance_id, wait=True, healthy=False, timeout=None):
-        if timeout:
-            starttime = time.time()
-
         ret = True
         group = self.find_group_by_instance(instance_id)
         if not group:
@@ -606,22 +603,19 @@ class billowRotate(object):
                 ret = False
 
         if wait:
-            waittime = timeout
-            if timeout:
-                waittime = self.wait_timeout(timeout, starttime)
-            if not self.wait_elb_registered(instance_id, timeout=waittime):
+            if not self.wait_elb_registered(instance_id, timeout=timeout):
                 ret = False
 
             if healthy:
-                if timeout:
-                    waittime = self.wait_timeout(timeout, starttime)
-                if not self.wait_elb_healthy(instance_id, timeout=waittime):
+                if not self.wait_elb_healthy(instance_id, timeout=timeout):
                     ret = False
 
         return ret
 
+    @deadline.bounded
     def terminate(self, instance_id, decrement_capacity=False, wait=True,
             timeout=None):
+        from boto.exception import BotoServerError
         ret = True
         group = self.find_group_by_instance(instance_id)
         if not group:
@@ -656,6 +650,7 @@ class billowRotate(object):
 
         return ret
 
+    @deadline.bounded
     def notify_terminate(self, group, instance_id, timeout=None):
         if 'urlterminate' not in group.settings:
             return True
@@ -674,9 +669,11 @@ class billowRotate(object):
         if not instance:
             return False
 
-        # Always require a timeout
-        if not timeout:
-            timeout = self.urltimeout
+        # Always require a timeout, never past the deadline
+        urltimeout = timeout.clip(self.urltimeout)
+        if timeout.expired():
+            self.log("instance %s timed out before terminate url" % instance_id)
+            return False
 
         url = 'http://%s:%d%s' % (instance.private_ip_address, port, path)
         data = '{}'
@@ -686,7 +683,7 @@ class billowRotate(object):
         self.log("instance %s terminate url %s" % (instance_id, url))
         retcode = True
         try:
-            with closing(urllib2.urlopen(req, timeout=timeout)) as f:
+            with closing(urllib2.urlopen(req, timeout=urltimeout)) as f:
                 raw = f.read()
         except urllib2.HTTPError, e:
             self.log("instance %s terminate url failure code %d reason %s" % \
@@ -706,6 +703,7 @@ class billowRotate(object):
                     (instance_id, raw))
         return retcode
 
+    @deadline.bounded
     def status_check(self, group, instance_id, sleep=5, timeout=None):
         """
         Check /status endpoint, return (True/False, code)
@@ -727,10 +725,10 @@ class billowRotate(object):
             self.log("instance %s status url invalid config" % instance_id)
             return (False, None)
 
-        # Always require a timeout
-        urltimeout = timeout
-        if not timeout:
-            urltimeout = self.urltimeout
+        # Always require a timeout, never past the deadline
+        urltimeout = timeout.clip(self.urltimeout)
+        if timeout.expired():
+            return (False, None)
 
         instance = self.find_group_instance(group, instance_id)
         if not instance:
@@ -779,6 +777,7 @@ class billowRotate(object):
 
         return (healthy, status)
 
+    @deadline.bounded
     def status_check_service(self, group, sleep=5, timeout=None):
         """
         Check service /status endpoint, return (True/False, code)
@@ -800,10 +799,10 @@ class billowRotate(object):
             self.log("service status url invalid config")
             return (False, None)
 
-        # Always require a timeout
-        urltimeout = timeout
-        if not timeout:
-            urltimeout = self.urltimeout
+        # Always require a timeout, never past the deadline
+        urltimeout = timeout.clip(self.urltimeout)
+        if timeout.expired():
+            return (False, None)
 
         # Find ELB, or exit
         if len(group.load_balancers) < 1:
@@ -855,20 +854,19 @@ class billowRotate(object):
 
         return (healthy, status)
 
+    @aws.polling
+    @aws.prioritized(aws.PRIORITY_LOW)
+    @deadline.bounded
     def wait_notify(self, group, instance_id, sleep=5, timeout=None):
         """
         Wait for GET to 'urlstatus' to return "OK" or '{"status": "OK"}'
         """
-        starttime = 0
-        if timeout:
-            starttime = time.time()
-
         healthy = False
         while not healthy:
             (healthy, status) = self.status_check(group, instance_id, sleep,
                     timeout)
 
-            if not healthy and timeout and (time.time() - starttime) > timeout:
+            if not healthy and timeout.expired():
                 self.log('timed out waiting for instance %s status url' \
                         % instance_id)
                 return False
@@ -877,31 +875,30 @@ class billowRotate(object):
                 timeoutstr = ''
                 if timeout:
                     timeoutstr = ' timeout %ds' \
-                            % int(timeout - (time.time() - starttime))
+                            % int(timeout.remaining())
                 responsestr = ''
                 if status and 'status' in status:
                     responsestr = ' notify %s' % status['status']
                 self.log('sleeping %ds waiting for instance %s status' \
                         '%s%s' % (sleep, instance_id, timeoutstr, responsestr))
-                time.sleep(sleep)
+                timeout.sleep(sleep)
 
         return True
 
+    @aws.polling
+    @aws.prioritized(aws.PRIORITY_LOW)
+    @deadline.bounded
     def wait_service(self, group, sleep=5, timeout=None):
         """
         Wait for GET to balancer 'urlservicestatus' to return "OK" or
         '{"status": "OK"}'
         """
-        starttime = 0
-        if timeout:
-            starttime = time.time()
-
         healthy = False
         while not healthy:
             (healthy, status) = self.status_check_service(group, sleep,
                     timeout)
 
-            if not healthy and timeout and (time.time() - starttime) > timeout:
+            if not healthy and timeout.expired():
                 self.log('timed out waiting for service status url')
                 return False
 
@@ -909,23 +906,22 @@ class billowRotate(object):
                 timeoutstr = ''
                 if timeout:
                     timeoutstr = ' timeout %ds' \
-                            % int(timeout - (time.time() - starttime))
+                            % int(timeout.remaining())
                 responsestr = ''
                 if status and 'status' in status:
                     responsestr = ' notify %s' % status['status']
                 self.log('sleeping %ds waiting for service status' \
                         '%s%s' % (sleep, timeoutstr, responsestr))
-                time.sleep(sleep)
+                timeout.sleep(sleep)
 
         return True
 
+    @deadline.bounded
     def rotate_instance(self, instance_id, wait=True, timeout=None):
         """
         Rotate a single instance in a Group
         """
         terminate_after = True
-        if timeout:
-            starttime = time.time()
 
         group = self.find_group_by_instance(instance_id)
         if not group:
@@ -955,7 +951,8 @@ class billowRotate(object):
                     'allocation %s interface %s' \
                     % (e['public_ip_address'], e['association_id'],
                         e['allocation_id'], e['network_interface_id']))
-            group.asg.disassociate_address(e['association_id'])
+            group.asg.disassociate_address(e['association_id'],
+                                           instance_id=e['instance_id'])
 
         privateips = self.get_secondaryips(instance_id)
         for p in privateips:
@@ -1009,10 +1006,7 @@ class billowRotate(object):
                 self.private_secondary_failures.append(p['private_ip_address'])
 
         # Full launch wait after addresses associated
-        waittime = timeout
-        if timeout:
-            waittime = self.wait_timeout(timeout, starttime)
-        ret = self.wait_launch(group, instlist, timeout=waittime)
+        ret = self.wait_launch(group, instlist, timeout=timeout)
         if ret == False:
             return False
 
@@ -1021,32 +1015,25 @@ class billowRotate(object):
             return False
 
         if terminate_after:
-            if timeout:
-                waittime = self.wait_timeout(timeout, starttime)
-
             self.log('terminating instance %s' % instance_id)
 
             # Terminate and wait
             if not self.terminate(instance_id, decrement_capacity=True,
-                    wait=True, timeout=waittime):
+                    wait=True, timeout=timeout):
                 return False
 
         return True
 
+    @deadline.bounded
     def rotate(self, wait=True, timeout=None):
-        if timeout:
-            starttime = time.time()
-
         errors = 0
 
         rotatelist = self.order()
         for instance in rotatelist:
-            waittime = timeout
-            if timeout:
-                waittime = self.wait_timeout(timeout, starttime)
-                # Abort rotation if no time left on the clock
-                if waittime <= 0:
-                    return False
+            # Abort rotation if no time left on the clock
+            if timeout.expired():
+                self.log('timed out, aborting')
+                return False
             ret = self.rotate_instance(instance, timeout=timeout)
             if not ret:
                 self.log('failed rotating %s' % instance)
@@ -1104,7 +1091,7 @@ class billowRotate(object):
         if not group:
             return False
 
-        instance = self.find_group_instance(group, instance_id)
+        instance = self.find_group_instance(group, instance_id, fresh=True)
         if not instance:
             return False
 
@@ -1142,6 +1129,7 @@ class billowRotate(object):
         return addrlist
 
     def put_secondaryip(self, instance_id, private_ip_address):
+        from boto.exception import BotoServerError
         if not private_ip_address:
             return False
         if not isinstance(private_ip_address, list):
@@ -1151,7 +1139,7 @@ class billowRotate(object):
         if not group:
             return False
 
-        instance = self.find_group_instance(group, instance_id)
+        instance = self.find_group_instance(group, instance_id, fresh=True)
         if not instance:
             return False
 
@@ -1177,19 +1165,25 @@ class billowRotate(object):
 
     def finalize_secondaryip(self):
         for g in self.service.groups:
-            for i in g.instances:
+            for i in g.get_instances(fresh=True):
                 if not self.private_secondary_failures:
                     return
                 for ni in i.interfaces:
                     if ('private_ip_addresses' not in ni or \
                             len(ni['private_ip_addresses']) == 0):
+                        repaired = False
                         for p in self.private_secondary_failures:
                             ret = self.put_secondaryip(i.id, p)
                             if ret:
                                 self.log('repair assigned private IP %s ' \
                                         'to instance %s' % (p, i.id))
                                 self.private_secondary_failures.remove(p)
+                                repaired = True
                                 break
+                        if repaired:
+                            # put_secondaryip assigns to the first
+                            # interface, i.interfaces is now out of date
+                            break
 
         for p in self.private_secondary_failures:
             self.log('failed repairing assignment of private IP %s' % p)
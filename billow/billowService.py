@@ -1,9 +1,4 @@
-from . import asg
-from . import dns
-from . import elb
-from . import sec
-from . import vpc
-import boto
+from . import backends
 import datetime
 import pprint
 import billow
@@ -16,6 +11,13 @@ class billowService(object):
     a large undulating mass of cloud services
     """
 
+    # Backends, built on first use
+    asg = backends.backend('asg')
+    dns = backends.backend('dns')
+    elb = backends.backend('elb')
+    sec = backends.backend('sec')
+    vpc = backends.backend('vpc')
+
     def __init__(self, service, groups=[], region='us-east-1', environ=None,
                  parent=None):
         self.service = service
@@ -32,21 +34,8 @@ class billowService(object):
             self.__region = service.split(':')[1]
             self.service = service.split(':')[0]
 
-        # Backends
-        if self.parent:
-            self.asg = self.parent.asg
-            self.dns = self.parent.dns
-            self.elb = self.parent.elb
-            self.sec = self.parent.sec
-            self.vpc = self.parent.vpc
-        else:
-            self.asg = asg.asg(self.region)
-            self.dns = dns.dns(self.region)
-            self.elb = elb.elb(self.region)
-            self.sec = sec.sec(self.region)
-            self.vpc = vpc.vpc(self.region)
-
         self.tagservice = 'service'
+        self.tagenviron = 'env'
 
     def config(self):
         self.__config = dict()
@@ -81,6 +70,7 @@ class billowService(object):
             self.__info['balancers'][str(b.name)] = b.info()
 
         self.__info['groups'] = list()
+        self.want_instances()
         for g in self.groups:
             self.__info['groups'].append(g.info())
 
@@ -132,14 +122,13 @@ class billowService(object):
         if self.__groups or not refresh:
             return
 
-        groupnames = list()
         groups = list()
         baseservice = None
 
-        # find all groups with service=(self)
-        tags = self.asg.list_tags(tag=self.tagservice, value=self.service)
-        for t in tags:
-            groupnames.append(t.resource_id)
+        # find all groups with service=(self), from the region tag index
+        groupnames = self.asg.tag_index.service_groups(
+            self.tagservice, self.tagenviron, self.service,
+            environ=self.environ)
         asgs = self.asg.get_groups(groupnames)
 
         # retrieve all autoscale groups, push in data to save round trips
@@ -177,6 +166,23 @@ class billowService(object):
                                 parent=self)
                         self.__balancers.append(b)
 
+    def load_groups(self):
+        """
+        Bulk load groups, along with the rest of the region's when there
+        is a parent region
+        """
+        if self.parent:
+            return self.parent.load_groups()
+        return self.asg.load_groups(self.__groups)
+
+    def want_instances(self):
+        """
+        Announce every group's instances before walking them, so the first
+        lookup fetches them all in a few calls
+        """
+        for g in self.groups:
+            g.want_instances()
+
     def refresh(self):
         self.__load()
         self.__load_groups()
@@ -251,12 +257,37 @@ class billowService(object):
                 return str(sg[0].name)
         return str(sgid)
 
+    def __prefetch_sgroups(self, sgids):
+        """
+        Look up unknown security groups concurrently, ahead of sg_name()
+        """
+        self.__load_sgroups()
+        known = [sg.id for sg in self.rawsgroups]
+        missing = list()
+        for sgid in sgids:
+            if sgid not in known and sgid not in missing:
+                missing.append(sgid)
+        if missing:
+            self.rawsgroups.extend(self.sec.get_groups_many(missing))
+
     @property
     def security_rules(self):
         self.__load_sgroups()
+        sgids = self.security_groups
+        grants = list()
+        for sg in self.rawsgroups:
+            # only the rules of our own groups are named below
+            if sg.id not in sgids:
+                continue
+            for sr in sg.rules:
+                for grant in sr.grants:
+                    if grant.group_id:
+                        grants.append(grant.group_id)
+        self.__prefetch_sgroups(grants)
+
         srules = dict()
         for sg in self.rawsgroups:
-            if sg.id not in self.security_groups:
+            if sg.id not in sgids:
                 continue
             sg_name = self.sg_name(sg.id)
             if sg_name not in srules:
@@ -0,0 +1,117 @@
+"""
+billow circuit breaker
+
+Tracks repeated ServiceUnavailable-style failures per endpoint (service and
+region).  After enough consecutive failures the circuit opens and calls fail
+fast instead of sleeping through backoff.  Once reset_timeout passes a single
+probe call is let through, closing the circuit again if it succeeds.  A probe
+ending without a verdict on the endpoint hands the turn to the next call.
+"""
+from boto.exception import BotoServerError
+import threading
+import time
+
+
+class CircuitOpenError(BotoServerError):
+
+    """
+    Raised instead of calling an endpoint whose circuit is open
+    """
+
+    def __init__(self, endpoint, retry_in):
+        super(CircuitOpenError, self).__init__(
+            503, 'Circuit Open',
+            'endpoint %s unavailable, retry in %ds' % (endpoint, retry_in))
+        self.error_code = 'CircuitOpen'
+        self.endpoint = endpoint
+
+
+class circuitBreaker(object):
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, endpoint, threshold=5, reset_timeout=30):
+        self.endpoint = endpoint
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """
+        Raise CircuitOpenError unless a call may go through, True when the
+        call is the probe
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return False
+            retry_in = self.opened + self.reset_timeout - time.time()
+            if self.state == self.OPEN and retry_in <= 0:
+                # let a single probe through
+                self.state = self.HALF_OPEN
+                return True
+            raise CircuitOpenError(self.endpoint, max(0, retry_in))
+
+    def release(self):
+        """
+        End a probe that neither succeeded nor failed, the next call probes
+        """
+        with self.lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or \
+                    self.failures >= self.threshold:
+                self.state = self.OPEN
+                self.opened = time.time()
+
+    @property
+    def is_open(self):
+        return self.state != self.CLOSED
+
+
+class nullBreaker(object):
+
+    """
+    A circuit that is always closed, eg. for replayed calls
+    """
+
+    is_open = False
+
+    def allow(self):
+        return False
+
+    def success(self):
+        pass
+
+    def failure(self):
+        pass
+
+    def release(self):
+        pass
+
+
+_breakers = dict()
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(endpoint):
+    """
+    Process-wide circuit breaker for endpoint, usually (host, region)
+    """
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = circuitBreaker(endpoint)
+        return _breakers[endpoint]
@@ -0,0 +1,70 @@
+"""
+billow on-disk cache
+
+Small JSON files kept between invocations, in $BILLOW_CACHE_DIR or
+~/.cache/billow.  Files are written atomically and readable by the owner only.
+A missing, unreadable or corrupt cache is treated as empty, and failing to
+write one is never fatal.
+"""
+import errno
+import json
+import os
+import tempfile
+
+
+def cache_dir():
+    path = os.environ.get('BILLOW_CACHE_DIR')
+    if not path:
+        path = os.path.join(os.path.expanduser('~'), '.cache', 'billow')
+    return path
+
+
+def cache_path(name):
+    return os.path.join(cache_dir(), name)
+
+
+def ensure_dir(path=None):
+    """
+    Create the cache directory, owner-only
+    """
+    if not path:
+        path = cache_dir()
+    try:
+        os.makedirs(path, 0700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+
+
+def read_json(name):
+    """
+    Load a cache file, None if missing or invalid
+    """
+    try:
+        with open(cache_path(name), 'r') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def write_json(name, data):
+    """
+    Atomically replace a cache file with mode 0600, returns success
+    """
+    path = cache_path(name)
+    try:
+        ensure_dir(os.path.dirname(path))
+
+        # mkstemp creates the file 0600
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path),
+                                   prefix='.%s.' % os.path.basename(path))
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.rename(tmp, path)
+        except:
+            os.unlink(tmp)
+            raise
+    except (IOError, OSError, TypeError, ValueError):
+        return False
+    return True
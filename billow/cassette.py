@@ -0,0 +1,176 @@
+"""
+billow AWS call record/replay
+
+Record mode saves every call made through aws.wrap() with its arguments and
+parsed boto response to a cassette file.  Replay mode serves those responses
+back without touching the network, optionally simulating the recorded latency,
+so commands can be benchmarked offline against a snapshot of a real fleet.
+
+Calls are keyed on a stable form of their arguments, so a key recorded in one
+process matches in the next.  Arguments without one fail with TypeError.
+"""
+import cPickle
+import datetime
+import json
+import threading
+import time
+
+
+def stable(value):
+    """
+    JSON form of a call argument, the same in every process
+    """
+    if value is None or isinstance(value, (bool, int, long, float,
+                                           basestring)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [stable(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(stable(v) for v in value)
+    if isinstance(value, dict):
+        return dict((str(k), stable(v)) for k, v in value.iteritems())
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError('cannot key %s argument in a cassette: %r' %
+                    (type(value).__name__, value))
+
+
+def owner_key(owner):
+    """
+    Stable name of the object owning a bound method, from its id or name
+    """
+    for attr in ('id', 'name'):
+        value = getattr(owner, attr, None)
+        if isinstance(value, basestring):
+            return '%s:%s' % (owner.__class__.__name__, value)
+    raise TypeError('cannot key calls on %s in a cassette' %
+                    owner.__class__.__name__)
+
+
+class cassette(object):
+
+    """
+    Cassette of recorded AWS calls
+
+    mode is 'record' or 'replay'.  In replay, latency scales the recorded call
+    latency (0 disables simulated latency, 1 replays it as recorded).
+    """
+
+    def __init__(self, path, mode='replay', latency=0.0):
+        if mode not in ('record', 'replay'):
+            raise ValueError('cassette mode must be record or replay')
+        self.path = path
+        self.mode = mode
+        self.latency = float(latency)
+        self.lock = threading.Lock()
+        self.calls = dict()
+        self.positions = dict()
+
+        if self.mode == 'replay':
+            self.load()
+
+    @property
+    def recording(self):
+        return self.mode == 'record'
+
+    @property
+    def replaying(self):
+        return self.mode == 'replay'
+
+    def key(self, action, region, awsfunc, args, nargs):
+        """
+        Identify a call by action, region, arguments and the object owning
+        the bound method when it is not a connection (eg. a Route53 Zone)
+        """
+        import boto.connection
+        owner = getattr(awsfunc, '__self__', None)
+        if owner is None or isinstance(owner,
+                                       boto.connection.AWSAuthConnection):
+            owner = None
+        else:
+            owner = owner_key(owner)
+        return json.dumps([action, region, owner, stable(args),
+                           stable(nargs)], sort_keys=True)
+
+    def record(self, key, result, latency, error=False):
+        with self.lock:
+            self.calls.setdefault(key, list()).append((error, result, latency))
+
+    def replay(self, key):
+        """
+        Return the next recorded response for key, repeating the last one
+        once exhausted.  Recorded errors are raised again.
+        """
+        with self.lock:
+            if key not in self.calls:
+                raise KeyError('call not found in cassette %s: %s' %
+                               (self.path, key))
+            responses = self.calls[key]
+            pos = self.positions.get(key, 0)
+            self.positions[key] = pos + 1
+            error, result, latency = responses[min(pos, len(responses) - 1)]
+
+        if self.latency > 0:
+            time.sleep(latency * self.latency)
+        if error:
+            raise result
+        return result
+
+    def call(self, action, region, awsfunc, *args, **nargs):
+        """
+        Record or replay awsfunc(*args, **nargs)
+        """
+        import boto.exception
+        key = self.key(action, region, awsfunc, args, nargs)
+        if self.replaying:
+            return self.replay(key)
+
+        starttime = time.time()
+        try:
+            result = awsfunc(*args, **nargs)
+        except boto.exception.BotoServerError as e:
+            self.record(key, e, time.time() - starttime, error=True)
+            raise
+        self.record(key, result, time.time() - starttime)
+        return result
+
+    def __persistent_id(self, obj):
+        # boto objects hold their connection, never serialize those
+        import boto.connection
+        if isinstance(obj, boto.connection.AWSAuthConnection):
+            return 'connection'
+        return None
+
+    def __persistent_load(self, pid):
+        return None
+
+    def save(self):
+        with self.lock:
+            with open(self.path, 'wb') as f:
+                p = cPickle.Pickler(f, cPickle.HIGHEST_PROTOCOL)
+                p.persistent_id = self.__persistent_id
+                p.dump(self.calls)
+
+    def load(self):
+        with self.lock:
+            with open(self.path, 'rb') as f:
+                u = cPickle.Unpickler(f)
+                u.persistent_load = self.__persistent_load
+                self.calls = u.load()
+            self.positions = dict()
+
+
+_cassette = None
+
+
+def get_cassette():
+    """
+    Process-wide cassette, or None when neither recording nor replaying
+    """
+    return _cassette
+
+
+def set_cassette(c):
+    global _cassette
+    _cassette = c
+    return c
@@ -2,13 +2,29 @@ import argparse
 import sys
 import errno
 import json
-import yaml
 import pprint
-from .util import common_parser, common_args, catch_sigint
+from .util import common_parser, image_parser, common_args, catch_sigint
 import billow
 import re
 
 
+def yaml_dump(output):
+    # yaml is slow to import, only load it for --yaml output
+    import yaml
+    return yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+
+
+def partial_status(bc):
+    """
+    Exit status EAGAIN when regions were skipped as unavailable
+    """
+    if bc.partial:
+        sys.stderr.write('partial results, regions unavailable: %s\n' %
+                         ', '.join(bc.partial))
+        return errno.EAGAIN
+    return 0
+
+
 def billow_list():
     catch_sigint()
     parser = common_parser('billow list')
@@ -30,19 +46,20 @@ def billow_list():
 
     output = list()
     bc = billow.billowCloud(regions=args.regions)
-    services = bc.list_services()
-    for s in services:
+    for s in bc.iter_services():
+        if not args.json and not args.yaml:
+            # plain output streams, region by region
+            print str(s)
+            sys.stdout.flush()
+            continue
         output.append(str(s))
 
     if args.json:
         print json.dumps(output)
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
-    else:
-        for o in output:
-            print o
+        print yaml_dump(output)
 
-    sys.exit(0)
+    sys.exit(partial_status(bc))
 
 
 def billow_get():
@@ -81,7 +98,7 @@ def billow_get():
     services = bc.get_service(args.services)
     if not services:
         sys.stderr.write('no service found\n')
-        sys.exit(errno.ENOENT)
+        sys.exit(partial_status(bc) or errno.ENOENT)
     for s in services:
         if args.info:
             output.append(s.info())
@@ -91,7 +108,7 @@ def billow_get():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         _first = True
         for o in output:
@@ -106,12 +123,12 @@ def billow_get():
                 else:
                     print "%s: %s" % (k, pprint.pformat(v))
 
-    sys.exit(0)
+    sys.exit(partial_status(bc))
 
 
 def billow_find_images():
     catch_sigint()
-    parser = common_parser('billow find images')
+    parser = image_parser('billow find images')
     parsergroup = parser.add_mutually_exclusive_group()
     parsergroup.add_argument(
         '-j',
@@ -155,7 +172,7 @@ def billow_find_images():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         for o in output:
             print "%s %s" % (str(o['id']), str(o['name']))
@@ -165,7 +182,7 @@ def billow_find_images():
 
 def billow_list_images():
     catch_sigint()
-    parser = common_parser('billow list images')
+    parser = image_parser('billow list images')
     parsergroup = parser.add_mutually_exclusive_group()
     parsergroup.add_argument(
         '-j',
@@ -211,7 +228,7 @@ def billow_list_images():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         for o in output:
             print "%s %s" % (str(o['id']), str(o['name']))
@@ -264,7 +281,7 @@ def billow_find_configs():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         for o in output:
             print "%s %s" % (str(o['name']), str(o['image_id']))
@@ -310,7 +327,7 @@ def billow_list_configs():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         for o in output:
             print "%s %s" % (str(o['name']), str(o['image_id']))
@@ -360,7 +377,7 @@ def billow_list_rotate():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         for o in output:
             print str(o)
@@ -423,7 +440,7 @@ def billow_rotate():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         for o in output:
             print str(o)
@@ -485,7 +502,7 @@ def billow_rotate_info():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         for o in output:
             print str(o)
@@ -544,7 +561,7 @@ def billow_rotate_status():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         for o in output:
             print str(o)
@@ -609,7 +626,7 @@ def billow_rotate_deregister():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         for o in output:
             print str(o)
@@ -675,7 +692,7 @@ def billow_rotate_register():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         for o in output:
             print str(o)
@@ -742,7 +759,7 @@ def billow_rotate_terminate():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         for o in output:
             print str(o)
@@ -807,7 +824,7 @@ def billow_rotate_instance():
     if args.json:
         print json.dumps(output, indent=4, separators=(',', ': '))
     elif args.yaml:
-        print yaml.safe_dump(output, encoding='utf-8', allow_unicode=True)
+        print yaml_dump(output)
     else:
         for o in output:
             print str(o)
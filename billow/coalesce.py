@@ -0,0 +1,161 @@
+"""
+billow request coalescing
+
+Lookups by id (eg. DescribeInstances) from different callers are gathered
+into one chunked call, each caller getting back the objects for its own ids.
+Callers running concurrently join the batch in flight, and ids announced
+ahead of time with want() (eg. by a service about to walk its groups) ride
+along with the next lookup, so walking many groups costs a few calls instead
+of one each.
+"""
+import sys
+import threading
+import time
+
+
+class batch(object):
+
+    def __init__(self):
+        self.ids = set()
+        self.results = dict()
+        self.error = None
+        self.done = threading.Event()
+
+
+class coalescer(object):
+
+    """
+    fetch(ids) returns the objects found for a list of ids, key(obj) gives
+    an object's id.  At most chunk ids are sent per fetch.
+    """
+
+    def __init__(self, fetch, key, chunk=100, window=0.02, maxage=10):
+        self.fetch = fetch
+        self.key = key
+        self.chunk = chunk
+        self.window = window
+        self.maxage = maxage
+        self.wanted = set()
+        self.results = dict()
+        self.pending = None
+        self.callers = 0
+        self.last_caller = (None, 0)
+        # bumped by invalidate(), so a fetch racing a write is not kept
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def want(self, ids):
+        """
+        Announce ids likely to be looked up soon
+        """
+        with self.lock:
+            self.wanted.update(ids)
+
+    def invalidate(self, ids=None):
+        """
+        Forget objects fetched ahead of time for ids, all of them without
+        ids, after they were changed by our own writes
+        """
+        with self.lock:
+            self.generation += 1
+            if ids is None:
+                self.results.clear()
+                return
+            for i in ids:
+                self.results.pop(i, None)
+
+    def __fetch(self, ids):
+        objs = list()
+        ids = sorted(ids)
+        for i in range(0, len(ids), self.chunk):
+            objs.extend(self.fetch(ids[i:i + self.chunk]))
+        return objs
+
+    def __run(self, b, previous):
+        """
+        Fetch batch b, along with the wanted ids not fetched recently.
+        previous is the (thread, time) of the get before this one.
+        """
+        (thread, started) = previous
+        if self.callers > 1 or \
+                (thread != threading.current_thread().ident and
+                 time.time() - started < self.window):
+            # other threads are looking up too, let them join
+            time.sleep(self.window)
+
+        with self.lock:
+            self.pending = None
+            now = time.time()
+            for i, (fetched, obj) in self.results.items():
+                if now - fetched > self.maxage:
+                    del self.results[i]
+            extra = self.wanted - b.ids - set(self.results)
+            self.wanted.clear()
+            generation = self.generation
+
+        try:
+            objs = self.__fetch(b.ids | extra)
+            now = time.time()
+            found = dict()
+            for obj in objs:
+                found[self.key(obj)] = obj
+            with self.lock:
+                if generation == self.generation:
+                    for i in extra:
+                        self.results[i] = (now, found.get(i))
+            b.results = found
+        except:
+            b.error = sys.exc_info()
+        finally:
+            b.done.set()
+
+    def get(self, ids, fresh=False):
+        """
+        Objects found for ids, in the order of ids.  fresh ignores objects
+        fetched ahead of time.
+        """
+        ready = dict()
+        with self.lock:
+            self.callers += 1
+            now = time.time()
+            previous = self.last_caller
+            self.last_caller = (threading.current_thread().ident, now)
+            for i in ids:
+                if i in self.results:
+                    (fetched, obj) = self.results.pop(i)
+                    if not fresh and now - fetched <= self.maxage:
+                        ready[i] = obj
+            missing = set(ids) - set(ready)
+
+            b = None
+            leader = False
+            if missing:
+                b = self.pending
+                if b is None:
+                    b = self.pending = batch()
+                    leader = True
+                b.ids.update(missing)
+
+        try:
+            if leader:
+                self.__run(b, previous)
+            elif b:
+                # poll so SIGINT is still delivered to the main thread
+                while not b.done.wait(1):
+                    pass
+
+            if b and b.error:
+                # a bad id elsewhere in the batch, look up our own alone
+                ready.update((self.key(obj), obj)
+                             for obj in self.__fetch(missing))
+            elif b:
+                ready.update((i, b.results.get(i)) for i in missing)
+        finally:
+            with self.lock:
+                self.callers -= 1
+
+        out = list()
+        for i in ids:
+            if ready.get(i) is not None:
+                out.append(ready[i])
+        return out
@@ -0,0 +1,144 @@
+"""
+billow launch configuration cache
+
+The LaunchConfiguration list of an account and region, kept on disk between
+invocations and reloaded in full once older than the cache time.  There is
+no API listing configurations by creation time, so the list cannot be
+brought up to date incrementally.
+
+Configurations are indexed by sorted name, so patterns with a literal prefix
+are answered by a bisect range scan before any regex is evaluated, see
+nameindex.
+"""
+from . import cache
+from . import nameindex
+import hashlib
+import threading
+import time
+
+# LaunchConfiguration attributes kept in the cache
+CONFIG_FIELDS = [
+    'name',
+    'image_id',
+    'instance_type',
+    'key_name',
+    'security_groups',
+    'instance_profile_name',
+    'spot_price',
+    'ebs_optimized',
+    'associate_public_ip_address',
+    'created_time',
+    'launch_configuration_arn',
+]
+
+def jsonable(value):
+    if value is None or isinstance(value, (bool, int, long, float,
+                                           basestring)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [jsonable(v) for v in value]
+    return str(value)
+
+
+class cachedConfig(object):
+
+    """
+    The cached attributes of a boto LaunchConfiguration
+    """
+
+    def __init__(self, fields):
+        for k in CONFIG_FIELDS:
+            setattr(self, k, fields.get(k))
+
+    def __repr__(self):
+        return 'LaunchConfiguration:%s' % self.name
+
+    @classmethod
+    def from_config(cls, lc):
+        fields = dict()
+        for k in CONFIG_FIELDS:
+            fields[k] = jsonable(getattr(lc, k, None))
+        return cls(fields)
+
+    def fields(self):
+        return dict((k, getattr(self, k)) for k in CONFIG_FIELDS)
+
+
+class configCache(object):
+
+    """
+    list_all() returns every LaunchConfiguration.  The snapshot answers
+    queries for cachetime seconds, in this process or the next, and is
+    reloaded in full after that.
+    """
+
+    def __init__(self, key, list_all, cachetime=60):
+        # never put credentials in the file name
+        self.filename = 'launch-configs-%s.json' % \
+            hashlib.sha1(repr(key)).hexdigest()[:16]
+        self.list_all = list_all
+        self.cachetime = cachetime
+        self.configs = None
+        self.index = nameindex.nameIndex()
+        self.snapshot = 0
+        self.lock = threading.Lock()
+
+    def load(self):
+        data = cache.read_json(self.filename)
+        if not isinstance(data, dict) or \
+                not isinstance(data.get('configs'), list):
+            return
+        self.configs = dict()
+        for fields in data['configs']:
+            if isinstance(fields, dict) and fields.get('name'):
+                self.configs[fields['name']] = cachedConfig(fields)
+        self.index = nameindex.nameIndex(self.configs.itervalues())
+        self.snapshot = data.get('snapshot', 0)
+
+    def save(self):
+        cache.write_json(self.filename, {
+            'snapshot': self.snapshot,
+            'configs': [c.fields() for c in self.configs.itervalues()],
+        })
+
+    def fresh(self):
+        return self.configs is not None and \
+            time.time() - self.snapshot < self.cachetime
+
+    def refresh(self, full=False):
+        """
+        Reload the snapshot if it is older than cachetime, or when full
+        """
+        with self.lock:
+            if self.configs is None:
+                self.load()
+            if not full and self.fresh():
+                return
+
+            self.configs = dict()
+            for lc in self.list_all():
+                self.configs[lc.name] = cachedConfig.from_config(lc)
+            self.index = nameindex.nameIndex(self.configs.itervalues())
+            self.snapshot = time.time()
+            self.save()
+
+    def all(self):
+        """
+        Cached configurations, sorted by name
+        """
+        self.refresh()
+        return self.index.all()
+
+    def search(self, regex):
+        """
+        Cached configurations whose name re.match()es regex
+        """
+        self.refresh()
+        return self.index.search(regex)
+
+    def match(self, match):
+        """
+        Cached configurations whose name fnmatch()es match
+        """
+        self.refresh()
+        return self.index.match(match)
@@ -0,0 +1,99 @@
+"""
+billow AWS connection registry
+
+boto connections are pooled per (service, region, credentials) so that every
+backend, group and service in the process reuses the same connection and its
+HTTP keep-alive pool instead of repeating connection setup and TLS handshakes.
+"""
+import threading
+
+
+def _connect_autoscale(region, **kwargs):
+    import boto.ec2.autoscale
+    return boto.ec2.autoscale.connect_to_region(region, **kwargs)
+
+
+def _connect_ec2(region, **kwargs):
+    import boto.ec2
+    return boto.ec2.connect_to_region(region, **kwargs)
+
+
+def _connect_elb(region, **kwargs):
+    import boto.ec2.elb
+    return boto.ec2.elb.connect_to_region(region, **kwargs)
+
+
+def _connect_vpc(region, **kwargs):
+    import boto.vpc
+    return boto.vpc.connect_to_region(region, **kwargs)
+
+
+def _connect_sts(region, **kwargs):
+    import boto.sts
+    return boto.sts.connect_to_region(region, **kwargs)
+
+
+def _connect_route53(region, **kwargs):
+    # Route53 is a global service
+    import boto.route53
+    return boto.route53.Route53Connection(**kwargs)
+
+
+def _connect_iam(region, **kwargs):
+    # IAM is a global service
+    import boto.iam
+    return boto.iam.IAMConnection(**kwargs)
+
+
+CONNECTORS = {
+    'autoscale': _connect_autoscale,
+    'ec2': _connect_ec2,
+    'elb': _connect_elb,
+    'vpc': _connect_vpc,
+    'sts': _connect_sts,
+    'route53': _connect_route53,
+    'iam': _connect_iam,
+}
+
+# Services without regional endpoints share one connection
+GLOBAL_SERVICES = frozenset(['route53', 'iam'])
+
+_connections = dict()
+_connections_lock = threading.Lock()
+
+
+def get_connection(service, region, access_key=None, secret_key=None,
+                   security_token=None):
+    """
+    Shared boto connection for service in region with the given credentials
+    """
+    if service not in CONNECTORS:
+        raise ValueError('unknown service %s' % service)
+    if service in GLOBAL_SERVICES:
+        region = None
+
+    key = (service, region, access_key, secret_key, security_token)
+    with _connections_lock:
+        if key in _connections:
+            return _connections[key]
+
+        kwargs = {
+            'aws_access_key_id': access_key,
+            'aws_secret_access_key': secret_key
+        }
+        if security_token:
+            kwargs['security_token'] = security_token
+
+        conn = CONNECTORS[service](region, **kwargs)
+        # unknown regions return None, do not remember those
+        if conn:
+            _connections[key] = conn
+        return conn
+
+
+def reset():
+    """
+    Drop all pooled connections
+    """
+    with _connections_lock:
+        _connections.clear()
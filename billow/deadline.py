@@ -0,0 +1,114 @@
+"""
+billow deadlines
+
+A single deadline threaded through rotation, HTTP status checks and aws.wrap
+so that every wait, poll interval and backoff sleep is clipped to the time
+remaining instead of each step starting its own full timeout.
+"""
+import contextlib
+import functools
+import inspect
+import threading
+import time
+
+_active = threading.local()
+
+
+class deadline(object):
+
+    """
+    Absolute deadline, timeout seconds from now.  A falsy timeout means no
+    deadline, matching the timeout=None/0 convention of billowRotate.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self.expires = None
+        if timeout:
+            self.expires = time.time() + timeout
+
+    def __nonzero__(self):
+        return self.expires is not None
+
+    def __repr__(self):
+        if self.expires is None:
+            return 'deadline(None)'
+        return 'deadline(%.1fs remaining)' % self.remaining()
+
+    def remaining(self):
+        """
+        Seconds left, never negative, None without a deadline
+        """
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.time())
+
+    def expired(self):
+        return self.expires is not None and time.time() >= self.expires
+
+    def clip(self, seconds):
+        """
+        seconds, no longer than the time remaining
+        """
+        if self.expires is None:
+            return seconds
+        return min(seconds, self.remaining())
+
+    def sleep(self, seconds):
+        time.sleep(self.clip(seconds))
+
+    def earliest(self, other):
+        if other is None or other.expires is None:
+            return self
+        if self.expires is None or other.expires < self.expires:
+            return other
+        return self
+
+    @contextlib.contextmanager
+    def active(self):
+        """
+        Apply this deadline (or an earlier one already active) to the AWS
+        calls made by this thread inside the block
+        """
+        previous = current()
+        _active.deadline = self.earliest(previous)
+        try:
+            yield
+        finally:
+            _active.deadline = previous
+
+
+def current():
+    """
+    Deadline active for this thread, or None
+    """
+    return getattr(_active, 'deadline', None)
+
+
+def ensure(timeout):
+    """
+    deadline from a timeout in seconds, deadline objects pass through
+    """
+    if isinstance(timeout, deadline):
+        return timeout
+    return deadline(timeout)
+
+
+def bounded(func):
+    """
+    Decorator turning the timeout argument of func into a deadline, active
+    for the AWS calls func makes
+    """
+    index = inspect.getargspec(func).args.index('timeout')
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if len(args) > index:
+            args = list(args)
+            args[index] = ensure(args[index])
+            d = args[index]
+        else:
+            d = kwargs['timeout'] = ensure(kwargs.get('timeout'))
+        with d.active():
+            return func(*args, **kwargs)
+    return wrapper
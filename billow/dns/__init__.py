@@ -3,43 +3,95 @@ billow DNS API
 """
 import billow
 from billow import aws
-import boto.route53
-import boto.route53.exception
-import boto.route53.zone
-import boto.sts
+from billow import cache
+import datetime
+import threading
+
+# Assumed-role credentials are reused until this close to expiry
+STS_EXPIRY_MARGIN = datetime.timedelta(minutes=5)
+STS_CACHE = 'sts-credentials.json'
+
+_credentials = dict()
+_credentials_lock = threading.Lock()
 
 
 class dns(object):
 
     def __init__(self, region):
         self.region = region
-        self.aws = aws.aws()
+        self.aws = aws.aws(region=self.region)
         self.r53 = None
+        self.r53roles = dict()
         self.sts = None
-        self.ststok = None
         self.role = None
 
-    def __connect(self, role=None):
-        if not self.sts:
-            self.sts = boto.sts.connect_to_region(self.region,
-                                                  aws_access_key_id=self.aws.access_key(),
-                                                  aws_secret_access_key=self.aws.secret_key())
+    def __credentials_key(self, role):
+        return '%s|%s' % (self.aws.access_key() or 'instance-profile', role)
 
-        if role:
-            if not self.ststok or role != self.role:
-                self.role = role
-                self.ststok = self.sts.assume_role(role, 'billow')
-                self.r53 = boto.connect_route53(
-                    aws_access_key_id=self.ststok.credentials.access_key,
-                    aws_secret_access_key=self.ststok.credentials.secret_key,
-                    security_token=self.ststok.credentials.session_token
+    def __valid(self, creds):
+        import boto.utils
+        try:
+            expiration = boto.utils.parse_ts(creds['expiration'])
+        except (KeyError, TypeError, ValueError):
+            return False
+        return expiration - STS_EXPIRY_MARGIN > datetime.datetime.utcnow()
+
+    def assume_role(self, role):
+        """
+        Credentials for role, reused from memory or the on-disk cache until
+        shortly before they expire
+        """
+        key = self.__credentials_key(role)
+        with _credentials_lock:
+            creds = _credentials.get(key)
+            if self.__valid(creds):
+                return creds
+
+            stored = cache.read_json(STS_CACHE)
+            if not isinstance(stored, dict):
+                stored = dict()
+            creds = stored.get(key)
+            if not self.__valid(creds):
+                if not self.sts:
+                    self.sts = self.aws.connect('sts')
+                token = self.aws.wrap(
+                    self.sts.assume_role,
+                    role,
+                    'billow'
                 )
+                creds = {
+                    'access_key': token.credentials.access_key,
+                    'secret_key': token.credentials.secret_key,
+                    'session_token': token.credentials.session_token,
+                    'expiration': token.credentials.expiration
+                }
 
-        if not self.r53:
-            self.r53 = boto.connect_route53(
-                aws_access_key_id=self.aws.access_key(),
-                aws_secret_access_key=self.aws.secret_key()
-            )
+                # prune expired entries while rewriting the cache
+                for k, v in stored.items():
+                    if not self.__valid(v):
+                        del stored[k]
+                stored[key] = creds
+                cache.write_json(STS_CACHE, stored)
+
+            _credentials[key] = creds
+            return creds
+
+    def __connect(self, role=None):
+        self.role = role
+
+        if role:
+            creds = self.assume_role(role)
+            if role not in self.r53roles or \
+                    self.r53roles[role][0] is not creds:
+                self.r53roles[role] = (creds, self.aws.connect(
+                    'route53',
+                    access_key=creds['access_key'],
+                    secret_key=creds['secret_key'],
+                    security_token=creds['session_token']
+                ))
+            self.r53 = self.r53roles[role][1]
+        else:
+            self.r53 = self.aws.connect('route53')
 
     def get_records(self, dnsname, role=None):
         self.__connect(role=role)
@@ -3,33 +3,31 @@ billow Load Balancer API
 """
 import billow
 from billow import aws
-import boto
-import boto.ec2
-import boto.ec2.elb
 
 
 class elb(object):
 
     def __init__(self, region):
         self.region = region
-        self.aws = aws.aws()
+        self.aws = aws.aws(region=self.region)
         self.elb = None
 
         self.default_idle_timeout = 60
 
     def _connect(self):
         if not self.elb:
-            self.elb = boto.ec2.elb.connect_to_region(
-                self.region,
-                aws_access_key_id=self.aws.access_key(),
-                aws_secret_access_key=self.aws.secret_key()
-            )
+            self.elb = self.aws.connect('elb')
 
     def list_elbs(self):
         """
         list all ELBs in a region
         """
-        self.elbs = list()
+        return list(self.iter_elbs())
+
+    def iter_elbs(self):
+        """
+        iterate over all ELBs in a region, a page at a time
+        """
         marker = None
         self._connect()
 
@@ -38,14 +36,13 @@ class elb(object):
                 self.elb.get_all_load_balancers,
                 marker=marker
             )
-            self.elbs.extend(elbs)
+            for e in elbs:
+                yield e
             if elbs.next_marker:
                 marker = elbs.next_marker
             else:
                 break
 
-        return self.elbs
-
     def get_elb(self, names):
         """
         get ELB(s) by name
@@ -0,0 +1,153 @@
+"""
+billow hedged requests
+
+A read call still running after the observed p95 latency of its action gets
+a duplicate request, and whichever answer arrives first is used.  Latencies
+are tracked per region and action, calls are not hedged until enough samples
+exist.  Both requests go through aws.wrap's limiter, so hedges are paid for
+out of the shared rate budget.
+
+Latency samples are the network time of single API requests, recorded by
+aws.wrap, so limiter waits and retry backoff do not inflate the p95.
+"""
+import collections
+import sys
+import threading
+
+# latencies kept per action, and needed before hedging it
+SAMPLES = 200
+MIN_SAMPLES = 20
+PERCENTILE = 0.95
+
+# never hedge sooner than this, in seconds
+MIN_DELAY = 0.05
+
+
+class latencyWindow(object):
+
+    """
+    Recent successful call latencies of one action
+    """
+
+    def __init__(self, size=SAMPLES):
+        self.samples = collections.deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, latency):
+        with self.lock:
+            self.samples.append(latency)
+
+    def percentile(self, p=PERCENTILE, minsamples=MIN_SAMPLES):
+        """
+        Latency at percentile p, None until minsamples are recorded
+        """
+        with self.lock:
+            if len(self.samples) < minsamples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class attempt(object):
+
+    def __init__(self):
+        self.result = None
+        self.error = None
+        self.finished = False
+
+
+class hedger(object):
+
+    def __init__(self, percentile=PERCENTILE, minsamples=MIN_SAMPLES):
+        self.percentile = percentile
+        self.minsamples = minsamples
+        self.windows = dict()
+        self.lock = threading.Lock()
+
+    def window(self, key):
+        with self.lock:
+            if key not in self.windows:
+                self.windows[key] = latencyWindow()
+            return self.windows[key]
+
+    def delay(self, key):
+        """
+        Seconds to wait for a call before hedging it, None to never hedge
+        """
+        p = self.window(key).percentile(self.percentile, self.minsamples)
+        if p is None:
+            return None
+        return max(MIN_DELAY, p)
+
+    def record(self, key, latency):
+        """
+        Successful request of key took latency seconds
+        """
+        self.window(key).add(latency)
+
+    def call(self, key, func):
+        """
+        Return (func(), hedged, won).  func runs again concurrently if the
+        first run is slower than the key's p95 latency, and the first
+        success wins; won is True when that was the hedge.  If both fail
+        the first error is raised.
+        """
+        delay = self.delay(key)
+        if delay is None:
+            return (func(), False, False)
+
+        cond = threading.Condition()
+
+        def run(a):
+            try:
+                a.result = func()
+            except:
+                a.error = sys.exc_info()
+            finally:
+                with cond:
+                    a.finished = True
+                    cond.notify_all()
+
+        def start():
+            a = attempt()
+            t = threading.Thread(target=run, args=(a,))
+            t.daemon = True
+            t.start()
+            return a
+
+        attempts = [start()]
+        with cond:
+            if not attempts[0].finished:
+                cond.wait(delay)
+            if not attempts[0].finished:
+                attempts.append(start())
+
+            while True:
+                for i, a in enumerate(attempts):
+                    if a.finished and a.error is None:
+                        return (a.result, len(attempts) > 1, i > 0)
+                if all(a.finished for a in attempts):
+                    e = attempts[0].error
+                    raise e[0], e[1], e[2]
+                # poll so SIGINT is still delivered to the main thread
+                cond.wait(1)
+
+
+_hedger = hedger()
+_enabled = False
+
+
+def get_hedger():
+    """
+    Process-wide hedger
+    """
+    return _hedger
+
+
+def set_enabled(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+
+def enabled():
+    return _enabled
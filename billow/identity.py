@@ -0,0 +1,63 @@
+"""
+billow instance identity
+
+The EC2 instance identity document (instance id, region, availability zone)
+never changes for the life of an instance, so it is fetched from the
+metadata service once and kept in the on-disk cache.  The cache is tied to
+the kernel boot id, so a volume moved to a new instance, or a rebooted one,
+looks the document up again.
+"""
+import threading
+from . import cache
+
+IDENTITY_CACHE = 'instance-identity.json'
+BOOT_ID = '/proc/sys/kernel/random/boot_id'
+
+_identity = None
+_identity_lock = threading.Lock()
+
+
+def boot_id():
+    try:
+        with open(BOOT_ID, 'r') as f:
+            return f.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def get_identity(timeout=1, num_retries=5):
+    """
+    Instance identity document as a dict, None when not running on EC2
+    """
+    global _identity
+    with _identity_lock:
+        if _identity is not None:
+            return _identity or None
+
+        boot = boot_id()
+        cached = cache.read_json(IDENTITY_CACHE)
+        if boot and isinstance(cached, dict) and \
+                cached.get('boot_id') == boot and cached.get('document'):
+            _identity = cached['document']
+            return _identity
+
+        import boto.utils
+        identity = boto.utils.get_instance_identity(timeout=timeout,
+                                                    num_retries=num_retries)
+        document = None
+        if identity and isinstance(identity.get('document'), dict):
+            document = identity['document']
+
+        # remember failures for this process only
+        _identity = document or dict()
+        if document and boot:
+            cache.write_json(IDENTITY_CACHE, {'boot_id': boot,
+                                              'document': document})
+        return document
+
+
+def get_region():
+    document = get_identity()
+    if not document:
+        return None
+    return document.get('region')
@@ -0,0 +1,136 @@
+"""
+billow region image catalog
+
+Every Image of the configured owners in a region, by default our own and
+those shared with us, indexed by sorted name and by tag.  Name patterns and
+tag lookups are answered locally until the snapshot is older than its
+freshness window, instead of one DescribeImages call per pattern.
+"""
+from . import nameindex
+import re
+import threading
+import time
+
+
+def filter_regex(pattern):
+    """
+    Regex matching the names a DescribeImages name filter matches: an
+    asterisk is any run of characters, a question mark any one character
+    and a backslash escapes either
+    """
+    regex = ''
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '\\' and i + 1 < len(pattern):
+            regex += re.escape(pattern[i + 1])
+            i += 2
+            continue
+        if c == '*':
+            regex += '.*'
+        elif c == '?':
+            regex += '.'
+        else:
+            regex += re.escape(c)
+        i += 1
+    return regex + '\\Z'
+
+
+class imageCatalog(object):
+
+    """
+    fetch() returns every Image in the region of the configured owners
+    """
+
+    def __init__(self, fetch, maxage=300):
+        self.fetch = fetch
+        self.maxage = maxage
+        self.names = nameindex.nameIndex()
+        self.by_tag = dict()
+        self.built = None
+        self.lock = threading.Lock()
+
+    def fresh(self):
+        return self.built is not None and \
+            time.time() - self.built <= self.maxage
+
+    def invalidate(self):
+        with self.lock:
+            self.built = None
+
+    def build(self):
+        """
+        Rebuild the catalog from a region-wide listing
+        """
+        images = self.fetch()
+        by_tag = dict()
+        for i in images:
+            for k, v in (i.tags or dict()).iteritems():
+                by_tag.setdefault((k, v), dict())[i.id] = i
+        names = nameindex.nameIndex(images, name=lambda i: i.name or '')
+        with self.lock:
+            self.names = names
+            self.by_tag = by_tag
+            self.built = time.time()
+
+    def ensure(self):
+        if not self.fresh():
+            self.build()
+
+    def all(self):
+        """
+        Images, sorted by name
+        """
+        self.ensure()
+        return self.names.all()
+
+    def match(self, match):
+        """
+        Images whose name matches match as a DescribeImages name filter
+        would, sorted by name
+        """
+        self.ensure()
+        return self.names.search(filter_regex(match))
+
+    def search(self, regex):
+        """
+        Images whose name re.match()es regex, sorted by name
+        """
+        self.ensure()
+        return self.names.search(regex)
+
+    def tagged(self, tags):
+        """
+        Images carrying every key and value in tags, sorted by name
+        """
+        self.ensure()
+        with self.lock:
+            found = None
+            for k, v in tags.iteritems():
+                ids = self.by_tag.get((k, v), dict())
+                if found is None:
+                    found = dict(ids)
+                else:
+                    found = dict((i, found[i]) for i in found if i in ids)
+                if not found:
+                    return list()
+        if found is None:
+            return self.names.all()
+        return sorted(found.itervalues(), key=lambda i: i.name or '')
+
+
+# Image owners cataloged, None for our own and those shared with us
+_owners = None
+
+
+def set_owners(owners):
+    """
+    Catalog the Images of owners (account ids, self, amazon,
+    aws-marketplace), None for the default
+    """
+    global _owners
+    _owners = list(owners) if owners else None
+
+
+def get_owners():
+    return _owners
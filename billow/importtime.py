@@ -0,0 +1,99 @@
+"""
+billow CLI startup budget
+
+Measure how long each billow-* command takes to import and build its parser
+(running it with --help, so no AWS calls are made) and compare it against a
+budget.  Interpreter startup is measured separately and subtracted.
+
+    python -m billow.importtime [--budget SECONDS] [--runs N]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+# console_scripts entry points, see setup.py
+COMMANDS = [
+    ('billow-list', 'billow_list'),
+    ('billow-get', 'billow_get'),
+    ('billow-find-configs', 'billow_find_configs'),
+    ('billow-list-configs', 'billow_list_configs'),
+    ('billow-find-images', 'billow_find_images'),
+    ('billow-list-images', 'billow_list_images'),
+    ('billow-list-rotate', 'billow_list_rotate'),
+    ('billow-rotate', 'billow_rotate'),
+    ('billow-rotate-info', 'billow_rotate_info'),
+    ('billow-rotate-deregister', 'billow_rotate_deregister'),
+    ('billow-rotate-instance', 'billow_rotate_instance'),
+    ('billow-rotate-register', 'billow_rotate_register'),
+    ('billow-rotate-status', 'billow_rotate_status'),
+    ('billow-rotate-terminate', 'billow_rotate_terminate'),
+]
+
+# seconds allowed on top of bare interpreter startup.  Measured with boto
+# 2.49 installed, best of 10 runs: 0.07-0.115s per command with boto kept out
+# of startup, 0.12-0.15s when it is imported, so a regression loading boto
+# again goes over.
+DEFAULT_BUDGET = 0.13
+
+
+def run(code, runs):
+    """
+    Best wall time of running code in a fresh interpreter
+    """
+    best = None
+    for n in range(runs):
+        starttime = time.time()
+        with open('/dev/null', 'w') as devnull:
+            subprocess.call([sys.executable, '-c', code], stdout=devnull,
+                            stderr=devnull)
+        elapsed = time.time() - starttime
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def measure(runs=3):
+    """
+    list of (command, seconds) startup cost above bare interpreter startup
+    """
+    baseline = run('pass', runs)
+    out = list()
+    for name, func in COMMANDS:
+        code = 'import sys; sys.argv = [%r, "--help"]; ' \
+               'from billow.cli import %s; %s()' % (name, func, func)
+        out.append((name, max(0.0, run(code, runs) - baseline)))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='billow CLI startup budget',
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument(
+        '--budget',
+        type=float,
+        default=DEFAULT_BUDGET,
+        help='seconds allowed per command'
+    )
+    parser.add_argument(
+        '--runs',
+        type=int,
+        default=3,
+        help='runs per command, best is kept'
+    )
+    args = parser.parse_args()
+
+    over = 0
+    for name, elapsed in measure(runs=args.runs):
+        status = 'ok'
+        if elapsed > args.budget:
+            status = 'OVER'
+            over += 1
+        print '%-26s %6.3fs %s' % (name, elapsed, status)
+
+    sys.exit(1 if over else 0)
+
+
+if __name__ == '__main__':
+    main()
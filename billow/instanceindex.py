@@ -0,0 +1,136 @@
+"""
+billow region instance index
+
+Every AutoScaleGroup instance in a region, from paginated DescribeInstances
+calls filtered on the aws:autoscaling:groupName tag, indexed by instance id
+and by group.  The index is rebuilt once it is older than its freshness
+window, so instance views in a region cost a few pages per window instead
+of one call per group per access.
+"""
+import threading
+import time
+
+GROUP_TAG = 'aws:autoscaling:groupName'
+
+
+class instanceIndex(object):
+
+    """
+    fetch() returns every instance tagged with GROUP_TAG in the region
+    """
+
+    def __init__(self, fetch, maxage=15):
+        self.fetch = fetch
+        self.maxage = maxage
+        self.by_id = dict()
+        self.by_group = dict()
+        self.built = None
+        # bumped by drop(), so a build racing a mutation is not trusted
+        self.generation = 0
+        self.lock = threading.Lock()
+        # one region-wide listing at a time
+        self.building = threading.Lock()
+
+    def fresh(self):
+        return self.built is not None and \
+            time.time() - self.built <= self.maxage
+
+    def invalidate(self):
+        with self.lock:
+            self.generation += 1
+            self.built = None
+
+    def drop(self, instance_ids):
+        """
+        Forget instances changed by our own writes, so the next lookup
+        fetches them again
+        """
+        with self.lock:
+            self.generation += 1
+            for i in instance_ids:
+                old = self.by_id.pop(i, None)
+                if old is None:
+                    continue
+                members = self.by_group.get(old.tags.get(GROUP_TAG))
+                if members:
+                    members.pop(i, None)
+
+    def interface_owner(self, network_interface_id):
+        """
+        Id of the indexed instance with network_interface_id attached
+        """
+        with self.lock:
+            for i in self.by_id.itervalues():
+                for n in i.interfaces:
+                    if n.id == network_interface_id:
+                        return i.id
+        return None
+
+    def __add(self, instance):
+        old = self.by_id.get(instance.id)
+        if old is not None:
+            members = self.by_group.get(old.tags.get(GROUP_TAG))
+            if members:
+                members.pop(instance.id, None)
+        self.by_id[instance.id] = instance
+        group = instance.tags.get(GROUP_TAG)
+        if group:
+            self.by_group.setdefault(group, dict())[instance.id] = instance
+
+    def build(self):
+        """
+        Rebuild the index from a region-wide listing
+        """
+        with self.lock:
+            generation = self.generation
+        instances = self.fetch()
+        with self.lock:
+            self.by_id = dict()
+            self.by_group = dict()
+            for i in instances:
+                self.__add(i)
+            if generation == self.generation:
+                self.built = time.time()
+            else:
+                # dropped while fetching, the listing may predate the write
+                self.built = None
+
+    def ensure(self):
+        if self.fresh():
+            return
+        with self.building:
+            # another caller may have rebuilt it while we waited
+            if not self.fresh():
+                self.build()
+
+    def add(self, instances):
+        """
+        Add or update instances looked up elsewhere
+        """
+        with self.lock:
+            for i in instances:
+                self.__add(i)
+
+    def lookup(self, instance_ids):
+        """
+        (found, missing): instances indexed for instance_ids, in order, and
+        the ids not in the index
+        """
+        self.ensure()
+        found = list()
+        missing = list()
+        with self.lock:
+            for i in instance_ids:
+                if i in self.by_id:
+                    found.append(self.by_id[i])
+                else:
+                    missing.append(i)
+        return (found, missing)
+
+    def group(self, name):
+        """
+        Instances tagged as members of group name
+        """
+        self.ensure()
+        with self.lock:
+            return self.by_group.get(name, dict()).values()
@@ -0,0 +1,277 @@
+"""
+billow API rate limiting
+
+Token buckets shared by every backend talking to the same account and region,
+so a throttled ELB call slows the ASG and EC2 calls competing for the same
+quota instead of each backend discovering the limit on its own.
+
+With set_shared(True) the buckets are also shared between processes on the
+same host through a lock-protected state file, so concurrent billow commands
+split the account quota instead of stampeding it together.
+"""
+from . import cache
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+# Call priorities, lower values go first when tokens are scarce
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+PRIORITIES = (PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)
+
+
+class tokenBucket(object):
+
+    """
+    Adaptive token bucket
+
+    Tokens refill at self.rate per second up to self.burst.  Each Throttling
+    response cuts the rate in half (no lower than self.minrate), each success
+    adds self.increase back until self.maxrate is reached again.
+
+    Callers waiting at a higher priority go first, and PRIORITY_LOW callers
+    leave a reserve of tokens untouched, so polling slows down before
+    mutations and critical reads do.
+    """
+
+    def __init__(self, rate=10.0, burst=20.0, minrate=0.5, maxrate=None,
+                 increase=0.1):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.minrate = float(minrate)
+        self.maxrate = float(maxrate or rate)
+        self.increase = float(increase)
+        self.tokens = self.burst
+        self.last = time.time()
+        self.lock = threading.Lock()
+
+        # tokens each priority must leave in the bucket
+        self.reserve = {
+            PRIORITY_HIGH: 0.0,
+            PRIORITY_NORMAL: 0.0,
+            PRIORITY_LOW: self.burst / 4
+        }
+        self.waiting = dict((p, 0) for p in PRIORITIES)
+        self.waitlock = threading.Lock()
+
+    @contextlib.contextmanager
+    def locked(self):
+        """
+        Hold the bucket state for update
+        """
+        with self.lock:
+            yield
+
+    def __refill(self, now):
+        elapsed = now - self.last
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+        self.last = now
+
+    def __preempted(self, priority):
+        with self.waitlock:
+            for p in PRIORITIES:
+                if p < priority and self.waiting[p]:
+                    return True
+        return False
+
+    def acquire(self, tokens=1.0, priority=PRIORITY_NORMAL):
+        """
+        Take tokens from the bucket, sleeping until they are available.
+        Returns the time spent sleeping.
+        """
+        slept = 0.0
+        with self.waitlock:
+            self.waiting[priority] += 1
+        try:
+            while True:
+                with self.locked():
+                    self.__refill(time.time())
+                    needed = tokens + self.reserve[priority]
+                    if self.tokens >= needed and \
+                            not self.__preempted(priority):
+                        self.tokens -= tokens
+                        return slept
+                    wait = max(0.05, (needed - self.tokens) / self.rate)
+                time.sleep(wait)
+                slept += wait
+        finally:
+            with self.waitlock:
+                self.waiting[priority] -= 1
+
+    def throttled(self):
+        """
+        Throttling response seen, back off the refill rate and drain the
+        bucket so every caller slows down at once
+        """
+        with self.locked():
+            self.rate = max(self.minrate, self.rate / 2)
+            self.tokens = min(self.tokens, 0.0)
+
+    def success(self):
+        """
+        Successful call, creep the refill rate back up
+        """
+        with self.locked():
+            if self.rate < self.maxrate:
+                self.rate = min(self.maxrate, self.rate + self.increase)
+
+    def throttling(self):
+        """
+        True while the refill rate is still cut back after a Throttling
+        response
+        """
+        with self.locked():
+            return self.rate < self.maxrate
+
+
+class sharedTokenBucket(tokenBucket):
+
+    """
+    Adaptive token bucket whose state lives in a file shared by every
+    process on the host, serialized with flock()
+    """
+
+    def __init__(self, path, **kwargs):
+        super(sharedTokenBucket, self).__init__(**kwargs)
+        self.path = path
+        try:
+            cache.ensure_dir(os.path.dirname(self.path))
+            os.close(os.open(self.path, os.O_RDWR | os.O_CREAT, 0600))
+        except OSError as e:
+            sys.stderr.write('rate-limit state %s unavailable, not shared: '
+                             '%s\n' % (self.path, e))
+            self.path = None
+
+    @contextlib.contextmanager
+    def locked(self):
+        with self.lock:
+            if not self.path:
+                yield
+                return
+
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                self.__load(fd)
+                yield
+                self.__save(fd)
+            finally:
+                # closing releases the lock
+                os.close(fd)
+
+    def __load(self, fd):
+        os.lseek(fd, 0, os.SEEK_SET)
+        raw = os.read(fd, 4096)
+        try:
+            state = json.loads(raw)
+            self.rate = float(state['rate'])
+            self.tokens = float(state['tokens'])
+            self.last = float(state['last'])
+        except (KeyError, TypeError, ValueError):
+            # new or corrupt state, keep our own
+            pass
+
+    def __save(self, fd):
+        raw = json.dumps({
+            'rate': self.rate,
+            'tokens': self.tokens,
+            'last': self.last
+        })
+        os.lseek(fd, 0, os.SEEK_SET)
+        os.ftruncate(fd, 0)
+        os.write(fd, raw)
+
+
+class actionBackoff(object):
+
+    """
+    Backoff delay tracked per API action
+
+    Failures grow the delay with decorrelated jitter so concurrent callers
+    spread their retries, successes halve it.  A throttled
+    DescribeInstanceHealth no longer slows down DescribeAutoScalingGroups.
+
+    The delay is a hint shared by every caller of an action.  How many times
+    a single call retries is bounded by that call's own delay, see grow().
+    """
+
+    def __init__(self, base=1.0):
+        self.base = float(base)
+        self.delays = dict()
+        self.lock = threading.Lock()
+
+    def delay(self, action):
+        with self.lock:
+            return self.delays.get(action, 0)
+
+    def grow(self, prev, maxdelay):
+        """
+        Next delay after prev, at most maxdelay
+        """
+        prev = max(self.base, prev)
+        return min(maxdelay, random.uniform(self.base, prev * 3))
+
+    def failure(self, action, maxdelay):
+        """
+        Grow the delay for action, returns the new delay
+        """
+        with self.lock:
+            delay = self.grow(self.delays.get(action, 0), maxdelay)
+            self.delays[action] = delay
+            return delay
+
+    def success(self, action):
+        with self.lock:
+            delay = self.delays.get(action, 0) / 2
+            if delay < self.base:
+                self.delays.pop(action, None)
+            else:
+                self.delays[action] = delay
+
+
+_buckets = dict()
+_backoffs = dict()
+_registry_lock = threading.Lock()
+_shared = False
+
+
+def set_shared(shared=True):
+    """
+    Share token buckets created from now on with other processes
+    """
+    global _shared
+    _shared = shared
+
+
+def get_bucket(key):
+    """
+    Process-wide token bucket for key, usually (access_key, region)
+    """
+    with _registry_lock:
+        if key not in _buckets:
+            if _shared:
+                # never put credentials in the file name
+                name = 'ratelimit-%s.json' % \
+                    hashlib.sha1(repr(key)).hexdigest()[:16]
+                _buckets[key] = sharedTokenBucket(cache.cache_path(name))
+            else:
+                _buckets[key] = tokenBucket()
+        return _buckets[key]
+
+
+def get_backoff(key):
+    """
+    Process-wide per-action backoff for key, usually (access_key, region)
+    """
+    with _registry_lock:
+        if key not in _backoffs:
+            _backoffs[key] = actionBackoff()
+        return _backoffs[key]
@@ -0,0 +1,108 @@
+"""
+billow sorted name index
+
+Objects kept sorted by name, so glob and regex patterns with a literal prefix
+are answered by a bisect range scan before any regex is evaluated.
+"""
+import bisect
+import fnmatch
+import re
+
+REGEX_SPECIAL = '.^$*+?{}[]\\|()'
+REGEX_QUANTIFIERS = '*+?{'
+GLOB_SPECIAL = '*?['
+
+
+def regex_prefix(regex):
+    """
+    Literal text every re.match() of regex starts with
+    """
+    # alternatives and case-insensitive matching share no literal prefix
+    if '|' in regex or re.compile(regex).flags & re.IGNORECASE:
+        return ''
+
+    prefix = ''
+    i = 0
+    if regex.startswith('^'):
+        # re.match() is anchored already
+        i = 1
+    while i < len(regex):
+        c = regex[i]
+        if c == '\\' and i + 1 < len(regex) and \
+                not regex[i + 1].isalnum():
+            # escaped punctuation is literal
+            literal = regex[i + 1]
+            width = 2
+        elif c in REGEX_SPECIAL:
+            break
+        else:
+            literal = c
+            width = 1
+        if regex[i + width:i + width + 1] and \
+                regex[i + width] in REGEX_QUANTIFIERS:
+            # the literal may repeat zero times
+            break
+        prefix += literal
+        i += width
+
+    return prefix
+
+
+def glob_prefix(pattern):
+    """
+    Literal text every fnmatch() of pattern starts with
+    """
+    for i, c in enumerate(pattern):
+        if c in GLOB_SPECIAL:
+            return pattern[:i]
+    return pattern
+
+
+class nameIndex(object):
+
+    """
+    objects sorted by name(obj), its name attribute by default
+    """
+
+    def __init__(self, objects=(), name=None):
+        if not name:
+            name = lambda o: o.name
+        entries = sorted(((name(o), o) for o in objects),
+                         key=lambda e: e[0])
+        self.names = [e[0] for e in entries]
+        self.objects = [e[1] for e in entries]
+
+    def __len__(self):
+        return len(self.names)
+
+    def all(self):
+        return list(self.objects)
+
+    def prefixed(self, prefix):
+        """
+        Objects whose name starts with prefix, sorted by name
+        """
+        return [o for n, o in self.__scan(prefix)]
+
+    def search(self, regex):
+        """
+        Objects whose name re.match()es regex, sorted by name
+        """
+        pattern = re.compile(regex)
+        return [o for n, o in self.__scan(regex_prefix(regex))
+                if pattern.match(n)]
+
+    def match(self, match):
+        """
+        Objects whose name fnmatch()es match, sorted by name
+        """
+        pattern = re.compile(fnmatch.translate(match))
+        return [o for n, o in self.__scan(glob_prefix(match))
+                if pattern.match(n)]
+
+    def __scan(self, prefix):
+        for i in xrange(bisect.bisect_left(self.names, prefix),
+                        len(self.names)):
+            if not self.names[i].startswith(prefix):
+                break
+            yield (self.names[i], self.objects[i])
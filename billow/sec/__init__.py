@@ -3,30 +3,28 @@ billow Security API
 """
 import billow
 from billow import aws
-import boto
-import boto.ec2
+
+# group ids per DescribeSecurityGroups call when looking up many
+GROUP_CHUNK = 100
 
 
 class sec(object):
 
     def __init__(self, region):
         self.region = region
-        self.aws = aws.aws()
+        self.aws = aws.aws(region=self.region)
         self.ec2 = None
         self.account_id = None
 
     def __connect(self):
         if not self.ec2:
-            self.ec2 = boto.ec2.connect_to_region(
-                self.region,
-                aws_access_key_id=self.aws.access_key(),
-                aws_secret_access_key=self.aws.secret_key()
-            )
+            self.ec2 = self.aws.connect('ec2')
 
     def get_account_id(self):
         if not self.account_id:
-            iam = boto.connect_iam()
-            self.account_id = iam.get_user()['get_user_response']['get_user_result'][
+            iam = self.aws.connect('iam')
+            user = self.aws.wrap(iam.get_user)
+            self.account_id = user['get_user_response']['get_user_result'][
                 'user']['arn'].split(':')[4]
         return self.account_id
 
@@ -48,6 +46,24 @@ class sec(object):
 
         return sgroups
 
+    def get_groups_many(self, groups):
+        """
+        get SecurityGroups in a region, GROUP_CHUNK ids per request, chunks
+        fetched concurrently
+        """
+        sgroups = list()
+        self.__connect()
+
+        calls = list()
+        for i in range(0, len(groups), GROUP_CHUNK):
+            calls.append((self.ec2.get_all_security_groups, (),
+                          {'group_ids': groups[i:i + GROUP_CHUNK]}))
+
+        for a in self.aws.wrap_many(calls):
+            sgroups.extend(a)
+
+        return sgroups
+
     def find_group(self, name, vpcid=None):
         """
         find SecurityGroups in a region
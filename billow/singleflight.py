@@ -0,0 +1,127 @@
+"""
+billow single-flight request deduplication
+
+Identical read calls (same region, action and normalized parameters) that
+are in flight at the same time, or repeated within a short window, share one
+network round trip.  Mutations forget the shared results for their region
+so reads after our own writes are never served stale, and callers polling
+for a change (reuse=False) only join calls still in flight.
+"""
+import copy
+import json
+import sys
+import threading
+import time
+
+# boto method prefixes that only read state
+READ_PREFIXES = ('get_', 'describe_', 'list_')
+
+
+def is_read(action):
+    return action.startswith(READ_PREFIXES)
+
+
+def normalize(value):
+    """
+    Form of a call parameter for use in a key: lists and sets of values
+    (eg. instance ids) are order-insensitive, tuples keep their order
+    """
+    if isinstance(value, (list, set, frozenset)):
+        items = [normalize(v) for v in value]
+        try:
+            return sorted(items)
+        except TypeError:
+            return items
+    if isinstance(value, tuple):
+        return [normalize(v) for v in value]
+    if isinstance(value, dict):
+        return dict((k, normalize(v)) for k, v in value.iteritems())
+    return value
+
+
+class flight(object):
+
+    def __init__(self, region):
+        self.region = region
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.finished = None
+
+
+class singleFlight(object):
+
+    def __init__(self, window=2.0):
+        self.window = window
+        self.flights = dict()
+        self.lock = threading.Lock()
+
+    def key(self, region, action, owner, args, nargs):
+        """
+        Positional arguments keep their order, their values are normalized
+        """
+        return json.dumps([region, action, owner,
+                           [normalize(a) for a in args], normalize(nargs)],
+                          sort_keys=True, default=repr)
+
+    def __expire(self, now):
+        for k, f in self.flights.items():
+            if f.finished is not None and now - f.finished > self.window:
+                del self.flights[k]
+
+    def do(self, key, region, func, reuse=True):
+        """
+        Return func(), or the result of an identical call in flight or, with
+        reuse, completed within the window.  Returns (result, shared).
+        """
+        with self.lock:
+            self.__expire(time.time())
+            f = self.flights.get(key)
+            if f is not None and not reuse and f.finished is not None:
+                f = None
+            leader = f is None
+            if leader:
+                f = flight(region)
+                self.flights[key] = f
+
+        if not leader:
+            # poll so SIGINT is still delivered to the main thread
+            while not f.event.wait(1):
+                pass
+            if f.error:
+                raise f.error[0], f.error[1], f.error[2]
+            return (copy.copy(f.result), True)
+
+        try:
+            f.result = func()
+            return (f.result, False)
+        except:
+            f.error = sys.exc_info()
+            with self.lock:
+                # errors are shared with callers in flight, never cached
+                if self.flights.get(key) is f:
+                    del self.flights[key]
+            raise
+        finally:
+            f.finished = time.time()
+            f.event.set()
+
+    def forget(self, region):
+        """
+        Drop results for region, eg. after a mutation.  Calls in flight
+        still answer their current callers, new callers start afresh.
+        """
+        with self.lock:
+            for k, f in self.flights.items():
+                if f.region == region:
+                    del self.flights[k]
+
+
+_flights = singleFlight()
+
+
+def get_flights():
+    """
+    Process-wide single-flight table
+    """
+    return _flights
@@ -0,0 +1,130 @@
+"""
+billow API call statistics
+
+Every call through aws.wrap() is recorded here per region and action, so slow
+commands can be explained by call counts, latency and time lost to throttling.
+"""
+import json
+import sys
+import threading
+
+# Latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+
+class apiStats(object):
+
+    """
+    Per-region, per-action API call counters and latency histograms
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.actions = dict()
+
+    def __new_action(self):
+        return {
+            'calls': 0,
+            'shared': 0,
+            'hedged': 0,
+            'hedge_wins': 0,
+            'errors': 0,
+            'retries': 0,
+            'throttled': 0,
+            'latency_total': 0.0,
+            'latency_max': 0.0,
+            'sleep_total': 0.0,
+            'histogram': [0] * (len(LATENCY_BUCKETS) + 1)
+        }
+
+    def record(self, action, region, latency, retries=0, slept=0.0,
+               throttled=False, error=False):
+        key = (region, action)
+        with self.lock:
+            if key not in self.actions:
+                self.actions[key] = self.__new_action()
+            a = self.actions[key]
+            a['calls'] += 1
+            a['retries'] += retries
+            a['latency_total'] += latency
+            a['latency_max'] = max(a['latency_max'], latency)
+            a['sleep_total'] += slept
+            if throttled:
+                a['throttled'] += 1
+            if error:
+                a['errors'] += 1
+
+            bucket = len(LATENCY_BUCKETS)
+            for i, b in enumerate(LATENCY_BUCKETS):
+                if latency <= b:
+                    bucket = i
+                    break
+            a['histogram'][bucket] += 1
+
+    def record_shared(self, action, region):
+        """
+        Call answered by an identical call in flight, see singleflight
+        """
+        key = (region, action)
+        with self.lock:
+            if key not in self.actions:
+                self.actions[key] = self.__new_action()
+            self.actions[key]['shared'] += 1
+
+    def record_hedged(self, action, region, won=False):
+        """
+        Slow call duplicated by a hedge, see hedge
+        """
+        key = (region, action)
+        with self.lock:
+            if key not in self.actions:
+                self.actions[key] = self.__new_action()
+            self.actions[key]['hedged'] += 1
+            if won:
+                self.actions[key]['hedge_wins'] += 1
+
+    def report(self):
+        """
+        Statistics as a list of dicts, busiest actions first
+        """
+        out = list()
+        with self.lock:
+            for (region, action), a in self.actions.iteritems():
+                entry = dict(a)
+                entry['region'] = region
+                entry['action'] = action
+                entry['latency_avg'] = 0.0
+                if a['calls']:
+                    entry['latency_avg'] = a['latency_total'] / a['calls']
+                # ordered [bucket, count] pairs, smallest latency first
+                entry['histogram'] = list()
+                for i, count in enumerate(a['histogram']):
+                    if i < len(LATENCY_BUCKETS):
+                        label = '<=%s' % LATENCY_BUCKETS[i]
+                    else:
+                        label = '>%s' % LATENCY_BUCKETS[-1]
+                    entry['histogram'].append([label, count])
+                out.append(entry)
+        return sorted(out, key=lambda e: e['calls'] + e['shared'],
+                      reverse=True)
+
+    def dump(self, f=None):
+        if not f:
+            f = sys.stderr
+        f.write(json.dumps(self.report(), indent=4, separators=(',', ': ')))
+        f.write('\n')
+        f.flush()
+
+
+stats = apiStats()
+
+
+def get_stats():
+    """
+    Process-wide API statistics
+    """
+    return stats
@@ -0,0 +1,98 @@
+"""
+billow region tag index
+
+Every AutoScaleGroup tag in a region, from one paginated DescribeTags pass,
+indexed by group and by service and environment.  Service discovery in a
+region reads the index until it is older than its freshness window, instead
+of one tag query per service.
+"""
+import threading
+import time
+
+
+class tagIndex(object):
+
+    """
+    fetch() iterates over every AutoScaleGroup tag in the region
+    """
+
+    def __init__(self, fetch, maxage=60):
+        self.fetch = fetch
+        self.maxage = maxage
+        self.by_group = dict()
+        self.by_service = dict()
+        self.built = None
+        self.lock = threading.Lock()
+
+    def fresh(self):
+        return self.built is not None and \
+            time.time() - self.built <= self.maxage
+
+    def invalidate(self):
+        with self.lock:
+            self.built = None
+
+    def build(self):
+        """
+        Rebuild the index from a region-wide listing
+        """
+        by_group = dict()
+        for t in self.fetch():
+            by_group.setdefault(t.resource_id, dict())[t.key] = t.value
+        with self.lock:
+            self.by_group = by_group
+            self.by_service = dict()
+            self.built = time.time()
+
+    def ensure(self):
+        if not self.fresh():
+            self.build()
+
+    def groups(self):
+        """
+        Dictionary of group name to its tags
+        """
+        self.ensure()
+        with self.lock:
+            return dict(self.by_group)
+
+    def tags(self, group):
+        """
+        Tags of group name
+        """
+        self.ensure()
+        with self.lock:
+            return dict(self.by_group.get(group, dict()))
+
+    def services(self, tagservice, tagenviron):
+        """
+        Dictionary of service to environment to sorted group names, for
+        groups carrying both tags
+        """
+        self.ensure()
+        with self.lock:
+            key = (tagservice, tagenviron)
+            if key not in self.by_service:
+                services = dict()
+                for group, tags in self.by_group.iteritems():
+                    if tagservice not in tags or tagenviron not in tags:
+                        continue
+                    services.setdefault(tags[tagservice], dict()).setdefault(
+                        tags[tagenviron], list()).append(group)
+                for environs in services.itervalues():
+                    for groups in environs.itervalues():
+                        groups.sort()
+                self.by_service[key] = services
+            return self.by_service[key]
+
+    def service_groups(self, tagservice, tagenviron, service, environ=None):
+        """
+        Group names of service, in environ when given
+        """
+        environs = self.services(tagservice, tagenviron).get(service, dict())
+        if environ:
+            return list(environs.get(environ, list()))
+        groups = list()
+        for e in sorted(environs):
+            groups.extend(environs[e])
+        return groups
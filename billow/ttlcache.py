@@ -0,0 +1,62 @@
+"""
+billow describe-result cache
+
+Results of read calls kept for a short, per resource type time to live.
+Callers that mutate a resource invalidate the entries it affects, so reads
+after our own writes are never served stale.
+"""
+import threading
+import time
+
+
+class ttlCache(object):
+
+    """
+    ttls maps resource type to seconds, types without a ttl are not cached
+    """
+
+    def __init__(self, ttls):
+        self.ttls = dict(ttls)
+        self.entries = dict()
+        self.lock = threading.Lock()
+
+    def get(self, kind, key):
+        """
+        (True, value) for a fresh entry, otherwise (False, None)
+        """
+        with self.lock:
+            entry = self.entries.get((kind, key))
+            if entry is None:
+                return (False, None)
+            (stored, value) = entry
+            if time.time() - stored > self.ttls.get(kind, 0):
+                del self.entries[(kind, key)]
+                return (False, None)
+            return (True, value)
+
+    def put(self, kind, key, value):
+        if not self.ttls.get(kind):
+            return
+        with self.lock:
+            self.entries[(kind, key)] = (time.time(), value)
+
+    def fetch(self, kind, key, loader):
+        """
+        Cached value, or loader() stored under kind and key
+        """
+        (found, value) = self.get(kind, key)
+        if found:
+            return value
+        value = loader()
+        self.put(kind, key, value)
+        return value
+
+    def invalidate(self, kind, match=None):
+        """
+        Drop entries of kind for which match(key, value) is true, all of
+        them without match
+        """
+        with self.lock:
+            for (k, key), (stored, value) in self.entries.items():
+                if k == kind and (match is None or match(key, value)):
+                    del self.entries[(k, key)]
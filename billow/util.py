@@ -25,24 +25,98 @@ def common_parser(description='untitled'):
         help='ec2 regions'
     )
 
+    parser.add_argument(
+        '--stats',
+        help='dump AWS API call statistics as JSON to stderr at exit',
+        action='store_true'
+    )
+
+    cassettegroup = parser.add_mutually_exclusive_group()
+    cassettegroup.add_argument(
+        '--record',
+        metavar='CASSETTE',
+        help='record AWS API calls to a cassette file'
+    )
+    cassettegroup.add_argument(
+        '--replay',
+        metavar='CASSETTE',
+        help='replay AWS API calls from a cassette file'
+    )
+
+    parser.add_argument(
+        '--shared-limiter',
+        help='share the AWS API rate limit with other billow processes',
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '--hedge',
+        help='duplicate slow read-only AWS API calls, first answer wins',
+        action='store_true'
+    )
+
+    parser.add_argument(
+        '--replay-latency',
+        type=float,
+        default=0.0,
+        help='scale recorded latency when replaying'
+    )
+
     return parser
 
-import boto.utils
+
+def image_parser(description='untitled'):
+    parser = common_parser(description)
+
+    parser.add_argument(
+        '--image-owner',
+        action='append',
+        metavar='OWNER',
+        help='list images of OWNER (account id, self, amazon, '
+             'aws-marketplace), repeatable; default our own images and '
+             'those shared with us'
+    )
+
+    return parser
+
+import atexit
+from . import cassette
+from . import hedge
+from . import identity
+from . import imagecatalog
+from . import limiter
+from . import stats
 
 
 def common_args(args):
 
+    if args.stats:
+        atexit.register(stats.get_stats().dump)
+
+    if args.shared_limiter:
+        limiter.set_shared(True)
+
+    if args.hedge:
+        hedge.set_enabled(True)
+
+    if getattr(args, 'image_owner', None):
+        imagecatalog.set_owners(args.image_owner)
+
+    if args.record:
+        tape = cassette.set_cassette(cassette.cassette(args.record,
+                                                       mode='record'))
+        atexit.register(tape.save)
+    elif args.replay:
+        cassette.set_cassette(cassette.cassette(args.replay, mode='replay',
+                                                latency=args.replay_latency))
+
     # Region setting:
     # 1. Prefer command-line --region
     # 2. Use instance metadata when --auto
     # 3. Default to us-east-1
     local_region = None
     if args.auto:
-        identity = boto.utils.get_instance_identity(timeout=1, num_retries=5)
-        try:
-            local_region = identity['document']['region']
-        except KeyError:
-            pass
+        local_region = identity.get_region()
     if not args.region:
         args.region = local_region
     else:
@@ -3,24 +3,21 @@ billow Virtual Private Cloud API
 """
 import billow
 from billow import aws
-import boto
-import boto.vpc
+
+# subnet ids per DescribeSubnets call when looking up many
+SUBNET_CHUNK = 100
 
 
 class vpc(object):
 
     def __init__(self, region):
         self.region = region
-        self.aws = aws.aws()
+        self.aws = aws.aws(region=self.region)
         self.vpc = None
 
     def __connect(self):
         if not self.vpc:
-            self.vpc = boto.vpc.connect_to_region(
-                self.region,
-                aws_access_key_id=self.aws.access_key(),
-                aws_secret_access_key=self.aws.secret_key()
-            )
+            self.vpc = self.aws.connect('vpc')
 
     def get_subnet(self, subnets):
         """
@@ -45,3 +42,23 @@ class vpc(object):
         if subnets:
             return subnets[0].cidr_block
         return subnet
+
+    def subnet_names(self, subnets):
+        """
+        subnet_name() for a list of subnets, SUBNET_CHUNK ids per request,
+        chunks looked up concurrently
+        """
+        self.__connect()
+
+        unique = sorted(set(subnets))
+        calls = list()
+        for i in range(0, len(unique), SUBNET_CHUNK):
+            calls.append((self.vpc.get_all_subnets, (),
+                          {'subnet_ids': unique[i:i + SUBNET_CHUNK]}))
+
+        cidrs = dict()
+        for snets in self.aws.wrap_many(calls):
+            for s in snets:
+                cidrs[s.id] = s.cidr_block
+
+        return [cidrs.get(s, s) for s in subnets]
@@ -13,7 +13,8 @@ setup(
     download_url='https://github.com/WrathOfChris/billow/tarball/%s' % __version__,
     license="BSD",
     include_package_data=True,
-    packages=find_packages(),
+    packages=find_packages(exclude=['tests']),
+    test_suite='tests',
     install_requires=[
         'boto',
         'PyYAML'
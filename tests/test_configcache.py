@@ -0,0 +1,91 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from billow import configcache
+
+
+class launchConfig(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.image_id = 'ami-%s' % name
+        self.security_groups = ['sg-1']
+
+
+class configCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.environ = os.environ.get('BILLOW_CACHE_DIR')
+        os.environ['BILLOW_CACHE_DIR'] = self.dir
+        self.listed = 0
+        self.configs = ['web-prod-1', 'api-prod-1']
+
+    def tearDown(self):
+        if self.environ is None:
+            del os.environ['BILLOW_CACHE_DIR']
+        else:
+            os.environ['BILLOW_CACHE_DIR'] = self.environ
+        shutil.rmtree(self.dir)
+
+    def list_all(self):
+        self.listed += 1
+        return [launchConfig(n) for n in self.configs]
+
+    def cache(self, cachetime=60):
+        return configcache.configCache(('123', 'us-east-1'), self.list_all,
+                                       cachetime=cachetime)
+
+    def test_first_refresh_lists(self):
+        c = self.cache()
+        self.assertEqual([lc.name for lc in c.all()],
+                         ['api-prod-1', 'web-prod-1'])
+        self.assertEqual(self.listed, 1)
+        self.assertEqual(c.all()[0].image_id, 'ami-api-prod-1')
+
+    def test_fresh_snapshot_reused(self):
+        c = self.cache()
+        c.refresh()
+        c.refresh()
+        c.search('web')
+        c.match('api-*')
+        self.assertEqual(self.listed, 1)
+
+    def test_snapshot_shared_through_disk(self):
+        self.cache().refresh()
+        self.configs.append('new-prod-1')
+        c = self.cache()
+        self.assertEqual(len(c.all()), 2)
+        self.assertEqual(self.listed, 1)
+
+    def test_full_refresh_lists(self):
+        c = self.cache()
+        c.refresh()
+        self.configs.append('new-prod-1')
+        c.refresh(full=True)
+        self.assertEqual(self.listed, 2)
+        self.assertEqual([lc.name for lc in c.match('new-*')], ['new-prod-1'])
+
+    def test_stale_snapshot_reloaded(self):
+        self.cache().refresh()
+        self.configs.remove('api-prod-1')
+        c = self.cache(cachetime=60)
+        c.load()
+        c.snapshot = time.time() - 120
+        c.refresh()
+        self.assertEqual(self.listed, 2)
+        self.assertEqual([lc.name for lc in c.all()], ['web-prod-1'])
+
+    def test_corrupt_cache_ignored(self):
+        c = self.cache()
+        with open(os.path.join(self.dir, c.filename), 'w') as f:
+            f.write('{not json')
+        self.assertEqual(len(c.all()), 2)
+        self.assertEqual(self.listed, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
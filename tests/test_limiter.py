@@ -0,0 +1,101 @@
+import threading
+import time
+import unittest
+
+from billow import limiter
+
+
+class tokenBucketTest(unittest.TestCase):
+
+    def test_acquire_takes_tokens(self):
+        bucket = limiter.tokenBucket(rate=10, burst=4)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertLess(bucket.tokens, 4)
+
+    def test_low_priority_leaves_reserve(self):
+        bucket = limiter.tokenBucket(rate=20, burst=4)
+        bucket.tokens = 1.5
+        bucket.last = time.time()
+        # the reserve is a quarter of the burst, high priority may use it
+        self.assertEqual(bucket.acquire(priority=limiter.PRIORITY_HIGH), 0.0)
+        bucket.tokens = 1.5
+        bucket.last = time.time()
+        self.assertGreater(bucket.acquire(priority=limiter.PRIORITY_LOW), 0.0)
+
+    def test_waiting_higher_priority_goes_first(self):
+        bucket = limiter.tokenBucket(rate=10, burst=4)
+        bucket.waiting[limiter.PRIORITY_HIGH] += 1
+        done = threading.Event()
+
+        def low():
+            bucket.acquire(priority=limiter.PRIORITY_LOW)
+            done.set()
+
+        t = threading.Thread(target=low)
+        t.daemon = True
+        t.start()
+        self.assertFalse(done.wait(0.2))
+        bucket.waiting[limiter.PRIORITY_HIGH] -= 1
+        self.assertTrue(done.wait(1))
+        t.join()
+
+    def test_throttled_halves_rate(self):
+        bucket = limiter.tokenBucket(rate=8, burst=4, minrate=3)
+        self.assertFalse(bucket.throttling())
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 4)
+        self.assertLessEqual(bucket.tokens, 0)
+        self.assertTrue(bucket.throttling())
+        bucket.throttled()
+        self.assertEqual(bucket.rate, 3)
+
+    def test_success_recovers_rate(self):
+        bucket = limiter.tokenBucket(rate=8, increase=3)
+        bucket.throttled()
+        bucket.success()
+        self.assertEqual(bucket.rate, 7)
+        bucket.success()
+        self.assertEqual(bucket.rate, 8)
+        self.assertFalse(bucket.throttling())
+
+
+class actionBackoffTest(unittest.TestCase):
+
+    def test_no_delay_before_failure(self):
+        backoff = limiter.actionBackoff()
+        self.assertEqual(backoff.delay('describe_tags'), 0)
+
+    def test_failure_grows_within_bounds(self):
+        backoff = limiter.actionBackoff(base=1.0)
+        delay = 0
+        for i in range(20):
+            delay = backoff.failure('describe_tags', 10.0)
+            self.assertGreaterEqual(delay, 1.0)
+            self.assertLessEqual(delay, 10.0)
+            self.assertEqual(backoff.delay('describe_tags'), delay)
+
+    def test_actions_are_independent(self):
+        backoff = limiter.actionBackoff()
+        backoff.failure('describe_instance_health', 10.0)
+        self.assertEqual(backoff.delay('get_all_groups'), 0)
+
+    def test_success_halves_then_clears(self):
+        backoff = limiter.actionBackoff(base=1.0)
+        backoff.delays['describe_tags'] = 4.0
+        backoff.success('describe_tags')
+        self.assertEqual(backoff.delay('describe_tags'), 2.0)
+        backoff.success('describe_tags')
+        self.assertEqual(backoff.delay('describe_tags'), 1.0)
+        backoff.success('describe_tags')
+        self.assertEqual(backoff.delay('describe_tags'), 0)
+
+    def test_grow_is_bounded(self):
+        backoff = limiter.actionBackoff(base=1.0)
+        for prev in (0, 1.0, 5.0, 50.0):
+            delay = backoff.grow(prev, 8.0)
+            self.assertGreaterEqual(delay, 1.0)
+            self.assertLessEqual(delay, 8.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+
+from billow import nameindex
+
+
+class named(object):
+
+    def __init__(self, name):
+        self.name = name
+
+
+class prefixTest(unittest.TestCase):
+
+    def test_regex_prefix(self):
+        self.assertEqual(nameindex.regex_prefix('web-prod-.*'), 'web-prod-')
+        self.assertEqual(nameindex.regex_prefix('^web'), 'web')
+        self.assertEqual(nameindex.regex_prefix('web\\.prod'), 'web.prod')
+        self.assertEqual(nameindex.regex_prefix('webs?'), 'web')
+        self.assertEqual(nameindex.regex_prefix('web\\d+'), 'web')
+        self.assertEqual(nameindex.regex_prefix('web|api'), '')
+        self.assertEqual(nameindex.regex_prefix('(?i)web'), '')
+
+    def test_glob_prefix(self):
+        self.assertEqual(nameindex.glob_prefix('web-*'), 'web-')
+        self.assertEqual(nameindex.glob_prefix('web?'), 'web')
+        self.assertEqual(nameindex.glob_prefix('[ab]pi'), '')
+        self.assertEqual(nameindex.glob_prefix('web'), 'web')
+
+
+class nameIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.names = ['api-prod-1', 'web-dev-1', 'web-prod-2', 'web-prod-1',
+                      'webs-prod-1', 'worker-prod-1']
+        self.index = nameindex.nameIndex([named(n) for n in self.names])
+
+    def names_of(self, objects):
+        return [o.name for o in objects]
+
+    def test_all_sorted(self):
+        self.assertEqual(self.names_of(self.index.all()), sorted(self.names))
+        self.assertEqual(len(self.index), len(self.names))
+
+    def test_prefixed(self):
+        self.assertEqual(self.names_of(self.index.prefixed('web-prod-')),
+                         ['web-prod-1', 'web-prod-2'])
+        self.assertEqual(self.index.prefixed('zzz'), list())
+        self.assertEqual(self.index.prefixed('a'), self.index.prefixed('api'))
+
+    def test_search(self):
+        self.assertEqual(self.names_of(self.index.search('web-prod-\\d')),
+                         ['web-prod-1', 'web-prod-2'])
+        self.assertEqual(self.names_of(self.index.search('webs?-prod')),
+                         ['web-prod-1', 'web-prod-2', 'webs-prod-1'])
+        self.assertEqual(self.names_of(self.index.search('.*-dev-')),
+                         ['web-dev-1'])
+        self.assertEqual(self.names_of(self.index.search('(?i)API')),
+                         ['api-prod-1'])
+
+    def test_match(self):
+        self.assertEqual(self.names_of(self.index.match('w*-prod-1')),
+                         ['web-prod-1', 'webs-prod-1', 'worker-prod-1'])
+        self.assertEqual(self.names_of(self.index.match('web-prod-?')),
+                         ['web-prod-1', 'web-prod-2'])
+
+    def test_custom_name(self):
+        index = nameindex.nameIndex(['b', 'a'], name=lambda o: o)
+        self.assertEqual(index.prefixed(''), ['a', 'b'])
+
+
+if __name__ == '__main__':
+    unittest.main()
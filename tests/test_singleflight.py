@@ -0,0 +1,102 @@
+import threading
+import unittest
+
+from billow import singleflight
+
+
+class normalizeTest(unittest.TestCase):
+
+    def test_lists_ignore_order(self):
+        self.assertEqual(singleflight.normalize(['i-2', 'i-1']),
+                         singleflight.normalize(['i-1', 'i-2']))
+        self.assertEqual(singleflight.normalize(set(['b', 'a'])), ['a', 'b'])
+
+    def test_tuples_keep_order(self):
+        self.assertEqual(singleflight.normalize(('b', 'a')), ['b', 'a'])
+
+    def test_nested(self):
+        self.assertEqual(
+            singleflight.normalize({'ids': ['b', 'a'], 'pair': (2, 1)}),
+            {'ids': ['a', 'b'], 'pair': [2, 1]})
+
+    def test_unorderable_kept(self):
+        value = [{'a': 1}, {'b': 2}]
+        self.assertEqual(len(singleflight.normalize(value)), 2)
+
+
+class keyTest(unittest.TestCase):
+
+    def setUp(self):
+        self.flights = singleflight.singleFlight()
+
+    def key(self, *args, **nargs):
+        return self.flights.key('us-east-1', 'get_all_groups', 'owner',
+                                args, nargs)
+
+    def test_positional_order_kept(self):
+        self.assertNotEqual(self.key('a', 'b'), self.key('b', 'a'))
+
+    def test_list_arguments_ignore_order(self):
+        self.assertEqual(self.key(['a', 'b']), self.key(['b', 'a']))
+        self.assertEqual(self.key(names=['a', 'b']),
+                         self.key(names=['b', 'a']))
+
+
+class doTest(unittest.TestCase):
+
+    def setUp(self):
+        self.flights = singleflight.singleFlight(window=60)
+        self.calls = 0
+
+    def func(self):
+        self.calls += 1
+        return [self.calls]
+
+    def test_reuse_within_window(self):
+        self.assertEqual(self.flights.do('k', 'r', self.func), ([1], False))
+        self.assertEqual(self.flights.do('k', 'r', self.func), ([1], True))
+        self.assertEqual(self.calls, 1)
+
+    def test_no_reuse_of_finished_call(self):
+        self.flights.do('k', 'r', self.func)
+        self.assertEqual(self.flights.do('k', 'r', self.func, reuse=False),
+                         ([2], False))
+        self.assertEqual(self.calls, 2)
+
+    def test_no_reuse_still_joins_call_in_flight(self):
+        started = threading.Event()
+        release = threading.Event()
+        results = list()
+
+        def slow():
+            started.set()
+            release.wait(5)
+            return self.func()
+
+        t = threading.Thread(
+            target=lambda: results.append(self.flights.do('k', 'r', slow)))
+        t.start()
+        started.wait(5)
+        joined = threading.Thread(target=lambda: results.append(
+            self.flights.do('k', 'r', self.func, reuse=False)))
+        joined.start()
+        release.set()
+        t.join()
+        joined.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(sorted(r[1] for r in results), [False, True])
+
+    def test_errors_not_cached(self):
+        def fail():
+            raise ValueError('boom')
+        self.assertRaises(ValueError, self.flights.do, 'k', 'r', fail)
+        self.assertEqual(self.flights.do('k', 'r', self.func), ([1], False))
+
+    def test_forget_region(self):
+        self.flights.do('k', 'r', self.func)
+        self.flights.forget('r')
+        self.assertEqual(self.flights.do('k', 'r', self.func), ([2], False))
+
+
+if __name__ == '__main__':
+    unittest.main()